@@ -1,54 +1,57 @@
+import os
 import streamlit as st
 import pandas as pd
 
 # 1. Import your custom modules
-from data_processing import load_data
-from tabs.overview_tab import render_overview_tab
-from tabs.geo_tab import render_geo_tab
-from tabs.map_tab import render_map_tab
-from tabs.diversity_tab import render_diversity_tab
-from tabs.research_tab import render_research_tab
-from tabs.pairwise_tab import render_pairwise_tab
-from tabs.cluster_tab import render_cluster_tab
-from tabs.advanced_insights_tab import render_advanced_insights_tab
-from tabs.comparer_tab import render_comparer_tab
-from tabs.conclusions_tab import render_conclusions_tab
-from tabs.data_view_tab import render_data_view_tab
-from tabs.eda_tab import render_eda_tab
+from filters import get_filter_engine
+from stats_cube import get_stats_cube
+from warmup import start_warmup
+from sections import TAB_TITLES, SCORE_RANGE, section_renderers
+import instrumentation
+from instrumentation import step
+
+# 'lazy' renders only the selected section; 'tabs' renders all of them inside st.tabs
+TAB_NAVIGATION = os.environ.get('WUR_TAB_NAVIGATION', 'lazy')
 
 # --- 2. Page Configuration ---
 st.set_page_config(page_title='World University Rankings Dashboard', page_icon='🎓', layout='wide')
+instrumentation.begin_run()  # Per-step timings for the Diagnostics panel (WUR_DIAGNOSTICS=1)
 
 # --- 3. Data Loading and Caching ---
-DF = load_data()
-df = DF.copy()  # Create a mutable copy for filtering
+# The filter engine is built once per process and holds the master DataFrame;
+# filtered views are taken from it without copying the full dataset on each rerun.
+with step('load_data'):
+    ENGINE = get_filter_engine()
+    DF = ENGINE.df
+    CUBE = get_stats_cube()  # Year x Country aggregates for the unfiltered charts
+
+# Compile the UMAP/HDBSCAN kernels in the background while the first pages render
+start_warmup()
 
 # --- 4. Sidebar Filters ---
 st.sidebar.success("✅ Dataset loaded and cleaned!")
 st.sidebar.header('Dashboard Filters')
 
-years = ['All'] + sorted(DF['Year'].unique().astype(str))
-sel_year = st.sidebar.selectbox('Year', years, index=len(years) - 1)
-if sel_year != 'All':
-    df = df[df['Year'] == int(sel_year)]
+with step('sidebar filters'):
+    years = ['All'] + [str(y) for y in ENGINE.years]
+    sel_year = st.sidebar.selectbox('Year', years, index=len(years) - 1)
+    year = None if sel_year == 'All' else int(sel_year)
 
-all_countries = sorted(df['Country'].unique())
-sel_ctry = st.sidebar.multiselect('Country', all_countries, default=[])
-if sel_ctry:
-    df = df[df['Country'].isin(sel_ctry)]
+    all_countries = ENGINE.countries(year=year)
+    sel_ctry = st.sidebar.multiselect('Country', all_countries, default=[])
 
-# Ensure rank and score ranges are valid after filtering
-min_rank, max_rank = int(df.Rank.min()), int(df.Rank.max())
-if min_rank < max_rank:
-    rank_rng = st.sidebar.slider('Rank range', min_rank, max_rank, (min_rank, max_rank))
-else:
-    rank_rng = (min_rank, max_rank) # Handle case with only one rank
+    # Ensure rank and score ranges are valid after filtering
+    min_rank, max_rank = ENGINE.rank_bounds(ENGINE.rows(year=year, countries=sel_ctry))
+    if min_rank < max_rank:
+        rank_rng = st.sidebar.slider('Rank range', min_rank, max_rank, (min_rank, max_rank))
+    else:
+        rank_rng = (min_rank, max_rank) # Handle case with only one rank
 
-min_score, max_score = 0.0, 100.0
-score_rng = st.sidebar.slider('Overall Score range', min_score, max_score, (min_score, max_score))
+    min_score, max_score = SCORE_RANGE
+    score_rng = st.sidebar.slider('Overall Score range', min_score, max_score, (min_score, max_score))
 
-# Apply final filters
-df = df[df['Rank'].between(*rank_rng) & df['Overall Score'].between(*score_rng)]
+    # Apply all filters in one pass over the engine's bitmaps and sorted columns
+    df = ENGINE.view(year=year, countries=sel_ctry, rank_range=rank_rng, score_range=score_rng)
 
 if not sel_ctry and sel_year == 'All':
     st.sidebar.info("Displaying global data for all years. Use filters to refine your view.")
@@ -72,36 +75,21 @@ else:
     st.warning("No data matches the current filter settings. Please adjust the filters in the sidebar.")
 
 # --- 6. Tabs ---
-tab_titles = ['Overview', 'Country & Continent', 'Animated World Map', 'Diversity', 
-              'Research & Industry', 'Pairwise Analysis', 'K-Means Clusters', 'Advanced Insights', 
-              'University Comparer','Conclusions','View Data','EDA']
-tabs = st.tabs(tab_titles)
-
-selected_vars = ['Overall Score', 'Teaching', 'Research Environment', 'Research Quality', 'Industry Impact']
-
-with tabs[0]:
-    render_overview_tab(df, DF)
-with tabs[1]:
-    render_geo_tab(DF)
-with tabs[2]:
-    render_map_tab(DF)
-with tabs[3]:
-    render_diversity_tab(df, DF)
-with tabs[4]:
-    render_research_tab(df, DF, selected_vars)
-with tabs[5]:
-    render_pairwise_tab(df, selected_vars)
-with tabs[6]:
-    render_cluster_tab(df, selected_vars)
-with tabs[7]:
-    render_advanced_insights_tab(df, DF, selected_vars)
-with tabs[8]:
-    render_comparer_tab(DF, selected_vars)
-with tabs[9]:
-    render_conclusions_tab()
-with tabs[10]:
-    render_data_view_tab(DF)
-with tabs[11]:
-    render_eda_tab(DF)
-
-st.caption('Dashboard created by Hritik Chouhan. Data source: Times Higher Education 2016-2025.')
\ No newline at end of file
+# Section list and renderer arguments are shared with the headless report (report.py)
+tab_titles = TAB_TITLES
+tab_renderers = section_renderers(df, DF, CUBE, ENGINE)
+
+if TAB_NAVIGATION == 'tabs':
+    # st.tabs only hides inactive tabs on the client, so every tab is computed on each rerun
+    for tab, title, render in zip(st.tabs(tab_titles), tab_titles, tab_renderers):
+        with tab, step(title):
+            render()
+else:
+    # Lazy navigation: only the selected section is computed on each rerun
+    active_tab = st.radio('Section', tab_titles, horizontal=True, key='active_tab', label_visibility='collapsed')
+    st.markdown('---')
+    with step(active_tab):
+        tab_renderers[tab_titles.index(active_tab)]()
+
+st.caption('Dashboard created by Hritik Chouhan. Data source: Times Higher Education 2016-2025.')
+instrumentation.end_run()
\ No newline at end of file
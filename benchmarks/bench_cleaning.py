@@ -0,0 +1,81 @@
+"""
+Before/after benchmark for the cleaning pipeline in data_processing.
+
+Run from the repository root:
+    python -m benchmarks.bench_cleaning --scales 1 100
+"""
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+from data_processing import clean_data, assign_continent
+from benchmarks.synthetic import load_raw
+
+
+def clean_data_rowwise(df):
+    """The original per-row cleaning pipeline, kept as the benchmark baseline."""
+    df['Year'] = df['Year'].astype(int)
+    df['Rank'] = df['Rank'].astype(str).str.replace('=', '').astype(float)
+
+    valid_intl = df[df['International Students'] != '%'].groupby('Name')['International Students'].first()
+    df['International Students'] = df.apply(
+        lambda row: valid_intl.get(row['Name'], row['International Students']) if row['International Students'] == '%' else row['International Students'],
+        axis=1
+    )
+    df['International Students'] = pd.to_numeric(df['International Students'].astype(str).str.replace('%', '').str.strip(), errors='coerce')
+
+    def ratio_to_pct(r):
+        if pd.isna(r): return np.nan
+        parts = [float(x) for x in re.split(r'\D+', str(r)) if x]
+        return parts[0] / sum(parts) * 100 if len(parts) >= 2 else np.nan
+
+    df['Female %'] = df['Female to Male Ratio'].apply(ratio_to_pct)
+
+    female_by_name = df.groupby('Name')['Female %'].mean()
+    df['Female %'] = df['Female %'].fillna(df['Name'].map(female_by_name))
+    female_by_country = df.groupby('Country')['Female %'].mean()
+    df['Female %'] = df['Female %'].fillna(df['Country'].map(female_by_country))
+
+    df['Male %'] = 100 - df['Female %']
+    df['Female Ratio'] = df['Female %'].round(0).astype('Int64')
+    df['Male Ratio'] = 100 - df['Female Ratio']
+
+    df['Students to Staff Ratio'] = pd.to_numeric(df['Students to Staff Ratio'], errors='coerce')
+    df.loc[df['Students to Staff Ratio'] > 100, 'Students to Staff Ratio'] = np.nan
+    df['Country'] = df['Country'].str.strip()
+    df.drop(columns=['Female to Male Ratio'], inplace=True)
+
+    df['Continent'] = df['Country'].apply(assign_continent)
+    return df
+
+
+def best_of(fn, raw, repeats):
+    """Returns (best wall time, result) over `repeats` runs on fresh copies of `raw`."""
+    best, out = float('inf'), None
+    for _ in range(repeats):
+        frame = raw.copy()
+        start = time.perf_counter()
+        out = fn(frame)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100], help='Dataset size multipliers')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for scale in args.scales:
+        raw = load_raw(scale)
+        repeats = args.repeats if scale <= 10 else 1
+        t_old, old = best_of(clean_data_rowwise, raw, repeats)
+        t_new, new = best_of(clean_data, raw, repeats)
+        pd.testing.assert_frame_equal(old, new)
+        print(f'{len(raw):>10,} {t_old:>14.3f} {t_new:>16.3f} {t_old / t_new:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup import profile of the dashboard.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+
+Each measurement runs in a fresh interpreter. The first one imports what app.py
+loads before its first widget renders and prints the cumulative time per module;
+then, for every section, a new interpreter loads the same startup modules and
+times the section's first import (its module plus the libraries it adds).
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+from sections import TAB_TITLES
+
+
+def startup_modules(app=Path('app.py')):
+    """The modules app.py imports at the top level, in order, read from its source."""
+    modules = []
+    for node in ast.parse(app.read_text()).body:
+        names = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+            [node.module] if isinstance(node, ast.ImportFrom) and node.module else []
+        modules += [n for n in names if n not in modules]
+    return modules
+
+
+# app.py's imports, in order (plotly comes in through streamlit)
+STARTUP_MODULES = startup_modules()
+
+_CHILD = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+times = []
+for name in {modules!r}:
+    t = time.perf_counter()
+    importlib.import_module(name)
+    times.append((name, time.perf_counter() - t))
+section = {section!r}
+if section:
+    from sections import load_section
+    t = time.perf_counter()
+    load_section(section)
+    times.append((section, time.perf_counter() - t))
+heavy = [m for m in ('plotly', 'plotly.express', 'sklearn', 'scipy', 'umap', 'hdbscan', 'numba', 'networkx',
+                     'statsmodels', 'seaborn', 'matplotlib') if m in sys.modules]
+print(json.dumps({{'times': times, 'heavy': heavy}}))
+'''
+
+
+def profile(section=None):
+    """Runs one fresh interpreter; returns ([(module or section, seconds)], loaded heavy libraries)."""
+    code = _CHILD.format(modules=STARTUP_MODULES, section=section)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    return result['times'], result['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup import profile of the dashboard.')
+    parser.add_argument('--sections', nargs='*', choices=TAB_TITLES, default=TAB_TITLES, metavar='SECTION')
+    args = parser.parse_args()
+
+    times, heavy = profile()
+    for name, seconds in times:
+        print(f'{name:<24} {seconds:7.3f}s')
+    print(f"{'startup total':<24} {sum(s for _, s in times):7.3f}s  loaded: {', '.join(heavy)}")
+    print()
+    for title in args.sections:
+        times, heavy = profile(title)
+        print(f'{title:<24} {times[-1][1]:7.3f}s  loaded: {", ".join(heavy)}')
+
+
+if __name__ == '__main__':
+    main()
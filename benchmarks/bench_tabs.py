@@ -0,0 +1,158 @@
+"""
+Benchmark for loading the dataset and rendering every dashboard section.
+
+Run from the repository root:
+    python -m benchmarks.bench_tabs --scales 1 10 100 --out bench_tabs.json
+    python -m benchmarks.bench_tabs --scales 1000 --sections Overview "View Data"
+
+Each scale loads a synthetic copy of the CSV (benchmarks.synthetic) through
+load_cleaned() into a temporary cache directory, builds the filter engine and
+statistics cube over it, then runs each section headlessly with the report's
+Recorder for the dashboard's default view (latest year) and for all years. Every
+step reports the cold wall time (first call, empty caches), the warm wall time
+(second call), peak traced memory of the cold call and the payload the browser
+would receive (figure JSON, Arrow-encoded tables, images, text).
+
+The similarity index, peer graph and name index are process-wide and always built
+over the real dataset. The model sections (K-Means, Advanced Insights) fit on the
+full selection and take minutes from 100x up; pick sections with --sections.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import data_processing
+from data_processing import compact_frame, load_cleaned
+from filters import FilterEngine
+from stats_cube import StatsCube
+from sections import TAB_TITLES
+from report import DEFAULT_PRESETS, DEFAULT_WIDGETS, render_section, quiet_streamlit
+from benchmarks.synthetic import load_raw
+
+
+def measure(fn):
+    """Runs `fn` once under tracemalloc; returns (result, wall seconds, peak bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        out = fn()
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return out, wall, peak
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _table_bytes(table):
+    try:
+        arrow = pa.Table.from_pandas(table.rename(columns=str))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, arrow.schema) as writer:
+            writer.write_table(arrow)
+        return sink.getvalue().size
+    except (pa.ArrowException, ValueError, TypeError):
+        return len(table.to_csv().encode())
+
+
+def payload(elements):
+    """Bytes the browser would receive for the recorded elements, and figure/table counts."""
+    total, figures, tables = 0, 0, 0
+    for e in elements:
+        if e['type'] == 'figure':
+            figures += 1
+            total += len(e['figure'].to_json().encode())
+        elif e['type'] == 'table':
+            tables += 1
+            total += _table_bytes(e['table'])
+        elif e['type'] == 'image':
+            total += len(e['png'])
+        else:
+            total += len(json.dumps(e, default=str).encode())
+    return total, figures, tables
+
+
+def bench_scale(scale, sections, presets, compact, workdir):
+    """Benchmarks one dataset scale; returns a list of result rows."""
+    rows = []
+    csv = Path(workdir) / f'rankings-x{scale}.csv'
+    load_raw(scale).to_csv(csv, index=False)
+    data_processing.CACHE_DIR = Path(workdir) / f'cache-x{scale}'
+
+    def load():
+        df = load_cleaned(csv)
+        return compact_frame(df) if compact else df
+
+    def record(step, preset, wall, warm, peak, size=0, figures=0, tables=0):
+        rows.append({'scale': scale, 'rows': len(df), 'compact': compact, 'step': step, 'preset': preset,
+                     'wall_s': wall, 'warm_wall_s': warm, 'peak_mb': peak / 2**20,
+                     'payload_bytes': size, 'figures': figures, 'tables': tables})
+        warm_s = '-' if warm is None else f'{warm:.3f}s'
+        print(f"{len(df):>11,} {preset or '':>12} {step:<22} {wall:8.3f}s {warm_s:>9} "
+              f"{peak / 2**20:9.1f} MB {size / 1024:9.1f} KB", flush=True)
+
+    df, wall, peak = measure(load)
+    record('load_data', None, wall, timed(load), peak)
+    engine, wall, peak = measure(lambda: FilterEngine(df))
+    record('filter_engine', None, wall, None, peak)
+    cube, wall, peak = measure(lambda: StatsCube(df))
+    record('stats_cube', None, wall, None, peak)
+
+    for preset in presets:
+        widgets = {**DEFAULT_WIDGETS, **preset.get('widgets', {})}
+        for title in sections:
+            run = lambda: render_section(preset, title, widgets, engine=engine, cube=cube)
+            elements, wall, peak = measure(run)
+            warm = timed(run)
+            record(title, preset['name'], wall, warm, peak, *payload(elements))
+    return rows
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='Dataset size multipliers (1000 needs several GB of memory)')
+    parser.add_argument('--sections', nargs='+', choices=TAB_TITLES, default=TAB_TITLES, metavar='SECTION')
+    parser.add_argument('--compact', action='store_true', help='Benchmark the compact in-memory schema')
+    parser.add_argument('--out', type=Path, default=Path('bench_tabs.json'), help='JSON results file')
+    args = parser.parse_args()
+
+    quiet_streamlit()
+    print(f"{'rows':>11} {'preset':>12} {'step':<22} {'cold':>9} {'warm':>9} {'peak':>12} {'payload':>12}")
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            results += bench_scale(scale, args.sections, DEFAULT_PRESETS, args.compact, workdir)
+
+    meta = {
+        'revision': _git_revision(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(), 'pandas': pd.__version__, 'cpus': os.cpu_count(),
+        'argv': sys.argv[1:],
+    }
+    args.out.write_text(json.dumps({'meta': meta, 'results': results}, indent=1))
+    print(f'{len(results)} results -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from data_processing import DATA_PATH
+
+
+def scale_raw(raw, factor, seed=0):
+    """
+    Builds a synthetic raw rankings table `factor` times the size of `raw`.
+
+    Each replica keeps the original country, year and ratio-string mix, but gets its
+    own suffixed university names so per-Name groups grow with the data instead of
+    collapsing onto the original 2.3k institutions. Scores are jittered slightly.
+
+    Args:
+        raw (pd.DataFrame): The raw CSV as read by pandas.
+        factor (int): Number of replicas.
+        seed (int): Seed for the score jitter.
+    """
+    if factor <= 1:
+        return raw.copy()
+    rng = np.random.default_rng(seed)
+    replicas = []
+    for i in range(factor):
+        rep = raw.copy()
+        if i:
+            rep['Name'] = rep['Name'] + f' ({i})'
+            for col in ['Teaching', 'Research Environment', 'Research Quality', 'Industry Impact', 'International Outlook']:
+                jitter = rng.normal(0, 1.0, len(rep)).round(1)
+                rep[col] = (rep[col] + jitter).clip(0, 100)
+        replicas.append(rep)
+    return pd.concat(replicas, ignore_index=True)
+
+
+def load_raw(factor=1, path=DATA_PATH):
+    """Reads the real CSV and scales it by `factor`."""
+    return scale_raw(pd.read_csv(path), factor)
@@ -1,88 +1,374 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import re
+import os
+import hashlib
+import inspect
+import functools
 from pathlib import Path
+import pyarrow as pa
+import pyarrow.feather as feather
+from instrumentation import instrumented_cache
 
 DATA_PATH = Path('THE World University Rankings 2016-2025.csv')
+CACHE_DIR = Path(os.environ.get('WUR_CACHE_DIR', '.cache'))
+# Opt-in compact in-memory schema (categoricals, narrow numerics), see compact_frame()
+COMPACT_SCHEMA = os.environ.get('WUR_COMPACT_SCHEMA', '0') == '1'
+
+LABEL_COLS = ['Name', 'Country', 'Continent']
+SCORE_COLS = ['Overall Score', 'Teaching', 'Research Environment', 'Research Quality',
+              'Industry Impact', 'International Outlook', 'Female %', 'Male %']
+
+ASIA = ['China', 'Japan', 'Singapore', 'South Korea', 'Turkey',
+        'India', 'Iran', 'Malaysia', 'Taiwan', 'Thailand',
+        'Pakistan', 'Jordan', 'Kazakhstan', 'Philippines',
+        'Vietnam', 'Sri Lanka', 'Hong Kong', 'Brunei Darussalam',
+        'Indonesia', 'Bangladesh', 'Russian Federation', 'Iraq',
+        'Azerbaijan', 'Israel', 'Saudi Arabia', 'Macao', 'Lebanon',
+        'Qatar', 'Oman', 'United Arab Emirates', 'Kuwait', 'Nepal', 'Palestine']
+AFRICA = ['South Africa', 'Uganda', 'Egypt', 'Ghana', 'Morocco',
+          'Algeria', 'Tunisia', 'Kenya', 'Botswana', 'Ethiopia',
+          'Zimbabwe', 'Namibia', 'Tanzania', 'Mozambique',
+          'Nigeria', 'Mauritius', 'Zambia']
+EUROPE = ['United Kingdom', 'Switzerland', 'Sweden', 'Germany',
+          'Belgium', 'Austria', 'Spain', 'Portugal', 'Norway',
+          'Bulgaria', 'Ireland', 'Italy', 'Czech Republic',
+          'Greece', 'Estonia', 'Cyprus', 'Hungary', 'Slovakia',
+          'Ukraine', 'Latvia', 'Lithuania', 'Serbia', 'Montenegro',
+          'Kosovo', 'North Macedonia', 'Bosnia and Herzegovina',
+          'France', 'Netherlands', 'Finland', 'Denmark', 'Romania',
+          'Iceland', 'Luxembourg', 'Poland', 'Slovenia', 'Georgia',
+          'Croatia', 'Armenia', 'Malta', 'Belarus', 'Northern Cyprus']
+NORTH_AMERICA = ['United States', 'Canada', 'Mexico', 'Puerto Rico', 'Jamaica']
+OCEANIA = ['Australia', 'New Zealand', 'Fiji']
+SOUTH_AMERICA = ['Brazil', 'Argentina', 'Chile', 'Colombia',
+                 'Venezuela', 'Peru', 'Ecuador', 'Uruguay',
+                 'Paraguay', 'Bolivia', 'Costa Rica', 'Cuba']
+
+# Country -> continent lookup, built once; earlier continents win on duplicates
+COUNTRY_CONTINENT = {}
+for _continent, _countries in reversed([
+        ('Asia', ASIA), ('Africa', AFRICA), ('Europe', EUROPE),
+        ('North America', NORTH_AMERICA), ('Oceania', OCEANIA), ('South America', SOUTH_AMERICA)]):
+    COUNTRY_CONTINENT.update(dict.fromkeys(_countries, _continent))
 
 def assign_continent(country):
     """Maps a country to its continent."""
-    asia = ['China', 'Japan', 'Singapore', 'South Korea', 'Turkey',
-            'India', 'Iran', 'Malaysia', 'Taiwan', 'Thailand',
-            'Pakistan', 'Jordan', 'Kazakhstan', 'Philippines',
-            'Vietnam', 'Sri Lanka', 'Hong Kong', 'Brunei Darussalam',
-            'Indonesia', 'Bangladesh', 'Russian Federation', 'Iraq',
-            'Azerbaijan', 'Israel', 'Saudi Arabia', 'Macao', 'Lebanon',
-            'Qatar', 'Oman', 'United Arab Emirates', 'Kuwait', 'Nepal', 'Palestine']
-    africa = ['South Africa', 'Uganda', 'Egypt', 'Ghana', 'Morocco',
-              'Algeria', 'Tunisia', 'Kenya', 'Botswana', 'Ethiopia',
-              'Zimbabwe', 'Namibia', 'Tanzania', 'Mozambique',
-              'Nigeria', 'Mauritius', 'Zambia']
-    europe = ['United Kingdom', 'Switzerland', 'Sweden', 'Germany',
-              'Belgium', 'Austria', 'Spain', 'Portugal', 'Norway',
-              'Bulgaria', 'Ireland', 'Italy', 'Czech Republic',
-              'Greece', 'Estonia', 'Cyprus', 'Hungary', 'Slovakia',
-              'Ukraine', 'Latvia', 'Lithuania', 'Serbia', 'Montenegro',
-              'Kosovo', 'North Macedonia', 'Bosnia and Herzegovina',
-              'France', 'Netherlands', 'Finland', 'Denmark', 'Romania',
-              'Iceland', 'Luxembourg', 'Poland', 'Slovenia', 'Georgia',
-              'Croatia', 'Armenia', 'Malta', 'Belarus', 'Northern Cyprus']
-    north_america = ['United States', 'Canada', 'Mexico', 'Puerto Rico', 'Jamaica']
-    oceania = ['Australia', 'New Zealand', 'Fiji']
-    south_america = ['Brazil', 'Argentina', 'Chile', 'Colombia',
-                     'Venezuela', 'Peru', 'Ecuador', 'Uruguay',
-                     'Paraguay', 'Bolivia', 'Costa Rica', 'Cuba']
-    if country in asia: return 'Asia'
-    if country in africa: return 'Africa'
-    if country in europe: return 'Europe'
-    if country in north_america: return 'North America'
-    if country in oceania: return 'Oceania'
-    if country in south_america: return 'South America'
-    return 'Unknown'
-
-@st.cache_data
-def load_data():
-    """Loads, cleans, and processes the university rankings data."""
-    df = pd.read_csv(DATA_PATH)
+    return COUNTRY_CONTINENT.get(country, 'Unknown')
+
+def map_unique(values, func):
+    """
+    Applies a Series-level transform to the distinct values of `values` only and
+    broadcasts the results back by factorized code. Columns such as ratio strings,
+    percentages and country names repeat a few hundred distinct values across every
+    row, so string parsing cost stays flat as the row count grows.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = func(pd.Series(uniques, dtype=values.dtype))
+    return mapped.iloc[codes].set_axis(values.index)
+
+def ratio_to_pct(ratios):
+    """
+    Converts 'Female to Male Ratio' strings (e.g. '33 : 67', '46:54:00') to a female
+    percentage: the first number over the sum of all numbers in the string.
+    Values with fewer than two numbers become NaN.
+    """
+    parts = ratios.reset_index(drop=True).astype('string').str.extractall(r'(\d+)')[0].astype(float)
+    by_row = parts.groupby(level=0)
+    first, total, count = by_row.first(), by_row.sum(), by_row.size()
+    pct = (first / total * 100).where(count >= 2)
+    return pd.Series(pct.reindex(range(len(ratios))).to_numpy(), index=ratios.index, dtype=float)
+
+# Per-row inputs of the imputations in impute(), stored next to the cleaned dataset so
+# new years can be appended without re-reading the full history (see ingest.py)
+IMPUTATION_COLS = ['intl_raw', 'intl_filled', 'female_raw', 'female_by_name']
+
+
+def parse_rows(df):
+    """
+    Row-local part of the cleaning: every value depends only on its own row.
 
+    Returns the frame, with the imputed columns holding their un-imputed values, and
+    a frame of IMPUTATION_COLS for impute(), which fills 'intl_filled' and 'female_by_name'.
+    """
     # Basic Cleaning
     df['Year'] = df['Year'].astype(int)
-    df['Rank'] = df['Rank'].astype(str).str.replace('=', '').astype(float)
+    df['Rank'] = map_unique(df['Rank'], lambda r: r.astype(str).str.replace('=', '').astype(float))
+    df['Country'] = map_unique(df['Country'], lambda c: c.str.strip())
 
     # --- International Students ---
-    valid_intl = df[df['International Students'] != '%'].groupby('Name')['International Students'].first()
-    df['International Students'] = df.apply(
-        lambda row: valid_intl.get(row['Name'], row['International Students']) if row['International Students'] == '%' else row['International Students'],
-        axis=1
-    )
-    df['International Students'] = pd.to_numeric(df['International Students'].astype(str).str.replace('%', '').str.strip(), errors='coerce')
+    # Bare '%' entries are back-filled by impute() with the first valid value of the university
+    intl = df['International Students']
 
     # --- Gender Ratios ---
-    def ratio_to_pct(r):
-        if pd.isna(r): return np.nan
-        parts = [float(x) for x in re.split(r'\D+', str(r)) if x]
-        return parts[0] / sum(parts) * 100 if len(parts) >= 2 else np.nan
-
-    df['Female %'] = df['Female to Male Ratio'].apply(ratio_to_pct)
-
-    # Smart imputation for missing Female %
-    female_by_name = df.groupby('Name')['Female %'].mean()
-    df['Female %'] = df['Female %'].fillna(df['Name'].map(female_by_name))
-    female_by_country = df.groupby('Country')['Female %'].mean()
-    df['Female %'] = df['Female %'].fillna(df['Country'].map(female_by_country))
-
-    df['Male %'] = 100 - df['Female %']
-    df['Female Ratio'] = df['Female %'].round(0).astype('Int64')
+    female_raw = map_unique(df['Female to Male Ratio'], ratio_to_pct)
+    df['Female %'] = female_raw
+    df['Male %'] = 100 - female_raw
+    df['Female Ratio'] = female_raw.round(0).astype('Int64')
     df['Male Ratio'] = 100 - df['Female Ratio']
 
     # --- Students to Staff Ratio ---
     df['Students to Staff Ratio'] = pd.to_numeric(df['Students to Staff Ratio'], errors='coerce')
     df.loc[df['Students to Staff Ratio'] > 100, 'Students to Staff Ratio'] = np.nan
-    df['Country'] = df['Country'].str.strip()
     df.drop(columns=['Female to Male Ratio'], inplace=True)
-    
+
     # --- Assign Continent ---
-    df['Continent'] = df['Country'].apply(assign_continent)
+    df['Continent'] = df['Country'].map(COUNTRY_CONTINENT).fillna('Unknown')
+
+    state = pd.DataFrame({
+        'intl_raw': intl.astype(object), 'intl_filled': intl.astype(object),
+        'female_raw': female_raw, 'female_by_name': female_raw,
+    }, index=df.index)
+    return df, state
+
+
+def impute(df, state, names=None, countries=None):
+    """
+    Fills the imputed columns from per-university and per-country statistics, in place.
+
+    With `names` and `countries`, only the statistics of those universities and
+    countries are recomputed, from all of their rows, and only rows of those
+    universities or countries are rewritten; the values of other rows cannot depend on
+    them. Each statistic is computed over the same rows in the same order as on the
+    full frame, so the result is identical to imputing everything.
+
+    Args:
+        df (pd.DataFrame): Frame from parse_rows() (or an earlier impute()).
+        state (pd.DataFrame): Its IMPUTATION_COLS, updated in place.
+        names (set): Universities whose rows changed; None imputes every row.
+        countries (set): Countries whose rows changed (their universities' countries
+            are added automatically).
+    """
+    name, country = df['Name'], df['Country']
+    if names is None:
+        by_name = by_country = np.ones(len(df), dtype=bool)
+    else:
+        by_name = name.isin(names).to_numpy()
+        by_country = country.isin(set(countries or ()) | set(country[by_name].dropna())).to_numpy()
+
+    # --- International Students ---
+    # Back-fill bare '%' entries with the first valid value recorded for that university
+    raw = state.loc[by_name, 'intl_raw']
+    missing = raw == '%'
+    first_valid = raw.mask(missing).groupby(name[by_name]).transform('first')
+    state.loc[by_name, 'intl_filled'] = raw.mask(missing, first_valid)
+    # Parsed over the distinct values of the whole column: its dtype (int64 unless any
+    # value is fractional or missing) depends on every row
+    df['International Students'] = map_unique(
+        state['intl_filled'],
+        lambda s: pd.to_numeric(s.astype(str).str.replace('%', '').str.strip(), errors='coerce')
+    )
+
+    # --- Female %: the university's mean, then the country's mean ---
+    female_by_name = state.loc[by_name, 'female_raw'].groupby(name[by_name]).mean()
+    state.loc[by_name, 'female_by_name'] = state.loc[by_name, 'female_raw'].fillna(name[by_name].map(female_by_name))
+    rows = state.loc[by_country, 'female_by_name']
+    female_by_country = rows.groupby(country[by_country]).mean()
+    female = rows.fillna(country[by_country].map(female_by_country))
+
+    female_ratio = female.round(0).astype('Int64')
+    if names is None:
+        df['Female %'] = female
+        df['Male %'] = 100 - female
+        df['Female Ratio'] = female_ratio
+        df['Male Ratio'] = 100 - female_ratio
+    else:
+        df.loc[by_country, 'Female %'] = female
+        df.loc[by_country, 'Male %'] = 100 - female
+        df.loc[by_country, 'Female Ratio'] = female_ratio
+        df.loc[by_country, 'Male Ratio'] = 100 - female_ratio
+    return df
+
+
+def clean_frame(df):
+    """Cleans the raw rankings data; returns the cleaned frame and its IMPUTATION_COLS."""
+    df, state = parse_rows(df)
+    return impute(df, state), state
+
+
+def clean_data(df):
+    """Cleans and processes the raw university rankings data."""
+    return clean_frame(df)[0]
+
+
+def _narrow_int(col, candidates):
+    """Returns the first integer dtype from `candidates` that holds `col` exactly, else None."""
+    values = col.dropna()
+    if len(values) and not (values == values.round()).all():
+        return None
+    for dtype in candidates:
+        info = np.iinfo(dtype.lower())
+        if values.empty or (values.min() >= info.min and values.max() <= info.max):
+            return dtype
+    return None
+
+
+def compact_frame(df):
+    """
+    Converts the cleaned frame to the compact schema: categoricals for the repeated
+    labels, float32 for 0-100 scores and the narrowest integer type that holds Year,
+    Rank and the ratio columns exactly. Columns are only narrowed when lossless for
+    integers; nullable integer types are used where a column has missing values.
+    """
+    df = df.copy()
+    for col in LABEL_COLS:
+        df[col] = df[col].astype('category')
+    for col in SCORE_COLS + ['Students to Staff Ratio', 'Student Population']:
+        df[col] = df[col].astype('float32')
+
+    int_candidates = {
+        'Year': ['int16', 'Int16'],
+        'Rank': ['int16', 'Int16', 'int32', 'Int32'],
+        'International Students': ['uint8', 'UInt8'],
+        'Female Ratio': ['Int8'],
+        'Male Ratio': ['Int8'],
+    }
+    for col, candidates in int_candidates.items():
+        if df[col].isna().any():
+            candidates = [c for c in candidates if c[0].isupper()]
+        dtype = _narrow_int(df[col], candidates)
+        df[col] = df[col].astype(dtype if dtype else 'float32')
+    return df
+
+
+def data_fingerprint(path=DATA_PATH):
+    """Hashes the source CSV together with this module's cleaning code."""
+    h = hashlib.sha256()
+    h.update(Path(path).read_bytes())
+    h.update(Path(__file__).read_bytes())
+    h.update(pd.__version__.encode())
+    return h.hexdigest()[:16]
+
+
+def _cache_path(fingerprint, kind='cleaned'):
+    return CACHE_DIR / f'{kind}-{fingerprint}.arrow'
+
+
+def _write_arrow(df, path):
+    """Writes a frame as an uncompressed Arrow IPC file, atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    feather.write_feather(df, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+
+def _write_cache(df, path, state=None):
+    """
+    Writes the cleaned frame and, if given, its imputation state (used by ingest.py)
+    next to it, then drops the files of older versions of the CSV or the cleaning code.
+    """
+    fingerprint = path.stem.split('-', 1)[1]
+    if state is not None:
+        _write_arrow(state, _cache_path(fingerprint, 'imputation'))
+    _write_arrow(df, path)
+    for kind in ('cleaned', 'imputation'):
+        for stale in path.parent.glob(f'{kind}-*.arrow'):
+            if stale != _cache_path(fingerprint, kind):
+                stale.unlink(missing_ok=True)
+
+
+def load_cleaned(path=DATA_PATH):
+    """
+    Returns the cleaned DataFrame, memory-mapping the on-disk cache when it matches
+    the current CSV and cleaning code, and rebuilding (and re-caching) it otherwise.
+    """
+    cache = _cache_path(data_fingerprint(path))
+    if cache.exists():
+        try:
+            # split_blocks keeps each numeric column a zero-copy view of the mapped file
+            return feather.read_table(cache, memory_map=True).to_pandas(split_blocks=True)
+        except (OSError, pa.ArrowInvalid):
+            cache.unlink(missing_ok=True)
+
+    df, state = clean_frame(pd.read_csv(path))
+    try:
+        _write_cache(df, cache, state)
+    except OSError:
+        pass  # A read-only filesystem only costs us the cache
+    return df
+
+
+# --- Shared read-only frame ---
+def _read_only(values):
+    """A view of a column's values that cannot be written to (no data is copied)."""
+    def ro(arr):
+        arr = arr.view()
+        arr.flags.writeable = False
+        return arr
+
+    if isinstance(values, pd.arrays.NumpyExtensionArray):
+        return ro(values.to_numpy())
+    if isinstance(values, pd.Categorical):
+        return pd.Categorical.from_codes(ro(values.codes), dtype=values.dtype, validate=False)
+    if isinstance(values, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        return type(values)(ro(values._data), ro(values._mask))
+    return values
+
+
+def _guard_inplace(method):
+    @functools.wraps(method)
+    def guarded(self, *args, **kwargs):
+        if kwargs.get('inplace'):
+            self._frozen()
+        return method(self, *args, **kwargs)
+    return guarded
+
+
+class FrozenFrame(pd.DataFrame):
+    """
+    Read-only DataFrame shared by every session of the process. Its column arrays
+    are not writable, and assigning, inserting or deleting columns, replacing
+    .columns or .index, and any method called with inplace=True raise TypeError
+    before anything changes. Anything derived from it (selections, copies, results
+    of its methods) is an ordinary, writable DataFrame.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError('The shared dataset is read-only; work on a copy (df.copy()) instead.')
+
+    __setitem__ = __delitem__ = insert = pop = _update_inplace = _frozen
+
+    def __setattr__(self, name, value):
+        if name in ('columns', 'index'):
+            self._frozen()
+        super().__setattr__(name, value)
+
+    def memory_usage(self, index=True, deep=False):
+        # pandas measures object columns through a writable buffer; a shallow copy
+        # of the frame shares the same Python objects, so the sizes are unchanged
+        return pd.DataFrame.memory_usage(self.copy() if deep else self, index=index, deep=deep)
+
+
+for _name, _method in inspect.getmembers(pd.DataFrame, inspect.isfunction):
+    if not _name.startswith('_') and 'inplace' in inspect.signature(_method).parameters:
+        setattr(FrozenFrame, _name, _guard_inplace(_method))
+
+
+def freeze(df):
+    """Returns a FrozenFrame over read-only views of `df`'s columns."""
+    return FrozenFrame({col: _read_only(df[col].array) for col in df.columns}, index=df.index, copy=False)
+
+
+@instrumented_cache(st.cache_resource)
+def load_data(compact=COMPACT_SCHEMA):
+    """
+    Loads, cleans, and processes the university rankings data. The frame is loaded
+    once per process and shared, without copying, by every session and caller, so it
+    is read-only (see FrozenFrame); its numeric columns stay memory-mapped from the
+    Arrow cache, so processes serving the same cache share their pages too.
+
+    Args:
+        compact (bool): Return the compact schema from compact_frame().
+    """
+    df = load_cleaned(DATA_PATH)
+    return freeze(compact_frame(df) if compact else df)
+
 
-    return df
\ No newline at end of file
+@instrumented_cache(st.cache_resource)
+def data_version():
+    """data_fingerprint() of the loaded dataset, computed once per process like load_data()."""
+    return data_fingerprint(DATA_PATH)
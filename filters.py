@@ -0,0 +1,156 @@
+import streamlit as st
+import numpy as np
+from functools import lru_cache
+from data_processing import freeze, load_data
+from name_index import NameIndex, get_name_index
+from instrumentation import instrumented_cache
+
+
+class FilterEngine:
+    """
+    Row index over the master dataset for the sidebar filters.
+
+    Built once per dataset: per-Year and per-Country row bitmaps (packed with
+    np.packbits) and Rank / Overall Score arrays sorted once for range lookups.
+    A filter combination is answered with bitwise ANDs/ORs and two binary searches
+    per range, and the resulting row subset is taken from the master frame once and
+    reused for as long as the same combination is selected.
+    """
+
+    def __init__(self, df, name_index=None):
+        self.df = df
+        self.n = len(df)
+
+        years = df['Year'].to_numpy()
+        self.years = [int(y) for y in np.unique(years)]
+        self._year_bits = {y: self._bitmap(np.flatnonzero(years == y)) for y in self.years}
+
+        codes, countries = df['Country'].factorize(sort=True)
+        self._country_codes = codes
+        self._countries = [str(c) for c in countries]
+        self._country_bits = {c: self._bitmap(np.flatnonzero(codes == i)) for i, c in enumerate(self._countries)}
+
+        self._rank = df['Rank'].to_numpy(dtype=float)
+        self._rank_order = np.argsort(self._rank, kind='stable')
+        self._rank_sorted = self._rank[self._rank_order]
+
+        score = df['Overall Score'].to_numpy()
+        self._score_order = np.argsort(score, kind='stable')
+        self._score_sorted = score[self._score_order]
+
+        self._all_bits = self._bitmap(np.arange(self.n))
+        self._view = instrumented_cache(lru_cache(maxsize=32), 'filters.view')(self._take)
+        self._search = instrumented_cache(lru_cache(maxsize=32), 'filters.search')(self._search_rows)
+        self._name_index = name_index
+        self._name_codes = None
+
+    def _bitmap(self, rows):
+        bits = np.zeros(self.n, dtype=bool)
+        bits[rows] = True
+        return np.packbits(bits)
+
+    def _range_bits(self, order, sorted_values, lo, hi):
+        """Bitmap of rows with lo <= value <= hi (NaN never matches, like Series.between)."""
+        start = np.searchsorted(sorted_values, lo, side='left')
+        stop = np.searchsorted(sorted_values, hi, side='right')
+        return self._bitmap(order[start:stop])
+
+    def _mask(self, year, countries, rank_range, score_range):
+        mask = self._all_bits
+        if year is not None:
+            mask = mask & self._year_bits.get(year, np.zeros_like(mask))
+        if countries:
+            known = [self._country_bits[c] for c in countries if c in self._country_bits]
+            mask = mask & (np.bitwise_or.reduce(known) if known else np.zeros_like(mask))
+        if rank_range is not None:
+            mask = mask & self._range_bits(self._rank_order, self._rank_sorted, *rank_range)
+        if score_range is not None:
+            mask = mask & self._range_bits(self._score_order, self._score_sorted, *score_range)
+        return mask
+
+    def rows(self, year=None, countries=(), rank_range=None, score_range=None):
+        """Returns the ascending row positions matching the given filters."""
+        mask = self._mask(year, tuple(countries), rank_range, score_range)
+        return np.flatnonzero(np.unpackbits(mask, count=self.n))
+
+    def countries(self, year=None):
+        """Sorted country names present in the given year (or in all years)."""
+        if year is None:
+            return list(self._countries)
+        present = np.unique(self._country_codes[self.rows(year=year)])
+        return [self._countries[i] for i in present]
+
+    def rank_bounds(self, rows):
+        """(min, max) Rank over the given row positions."""
+        ranks = self._rank[rows]
+        return int(np.nanmin(ranks)), int(np.nanmax(ranks))
+
+    def _take(self, year, countries, rank_range, score_range):
+        rows = self.rows(year, countries, rank_range, score_range)
+        if len(rows) == self.n:
+            return self.df
+        return freeze(self.df.take(rows))  # Shared by every session, like the master frame
+
+    def _name_bits(self, query):
+        """Bitmap of rows whose Name contains `query` (ignoring case and accents), matched per unique name."""
+        if self._name_codes is None:
+            if self._name_index is None:
+                self._name_index = NameIndex(self.df)
+            names = np.array(self._name_index.names)
+            row_names = self.df['Name'].astype(str).to_numpy()
+            codes = np.searchsorted(names, row_names)
+            known = (codes < len(names)) & (names[np.minimum(codes, len(names) - 1)] == row_names)
+            self._name_codes = np.where(known, codes, -1)
+        hit = np.append(self._name_index.matches(query), False)
+        return self._bitmap(np.flatnonzero(hit[self._name_codes]))  # code -1 (missing) -> False
+
+    def _search_rows(self, years, countries, query, sort_by, ascending):
+        if sort_by is not None:
+            rows = self._search(years, countries, query, None, True)
+            values = self.df[sort_by].take(rows).reset_index(drop=True)
+            order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index
+            return rows[order.to_numpy()]
+
+        year_bits = [self._year_bits[y] for y in years if y in self._year_bits]
+        country_bits = [self._country_bits[c] for c in countries if c in self._country_bits]
+        if not year_bits or not country_bits:
+            return np.array([], dtype=np.intp)
+        mask = np.bitwise_or.reduce(year_bits) & np.bitwise_or.reduce(country_bits)
+        if query:
+            mask = mask & self._name_bits(query)
+        return np.flatnonzero(np.unpackbits(mask, count=self.n))
+
+    def search(self, years, countries, query='', sort_by=None, ascending=True):
+        """
+        Row positions for the Data Explorer, cached per combination so page turns
+        and re-sorts reuse the filtered (and sorted) result.
+
+        Args:
+            years (iterable): Years to keep; an empty selection matches nothing.
+            countries (iterable): Countries to keep; an empty selection matches nothing.
+            query (str): Substring the Name must contain, ignoring case, accents and punctuation.
+            sort_by (str): Column to sort by (stable, missing values last), or None
+                to keep the dataset order.
+            ascending (bool): Sort direction.
+
+        Returns:
+            np.ndarray: Row positions into the master frame.
+        """
+        return self._search(tuple(sorted(years)), tuple(sorted(countries)), query or '', sort_by, ascending)
+
+    def view(self, year=None, countries=(), rank_range=None, score_range=None):
+        """
+        Returns the filtered frame. The unfiltered selection is the master frame
+        itself; other selections are taken once and cached per filter combination,
+        read-only like the master frame since every session shares them.
+        """
+        countries = tuple(sorted(countries))
+        rank_range = tuple(rank_range) if rank_range is not None else None
+        score_range = tuple(score_range) if score_range is not None else None
+        return self._view(year, countries, rank_range, score_range)
+
+
+@instrumented_cache(st.cache_resource)
+def get_filter_engine():
+    """Builds the filter engine once per process over the loaded dataset."""
+    return FilterEngine(load_data(), get_name_index())
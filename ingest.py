@@ -0,0 +1,188 @@
+"""
+Appends a new ranking year to the dataset without reprocessing the full history.
+
+Run from the repository root:
+    python ingest.py "THE World University Rankings 2026.csv"
+
+The new file (same columns as the combined CSV) is appended to the combined CSV,
+and the stored cleaned dataset is extended instead of rebuilt: only the new rows are
+parsed, and only the imputation statistics of the universities and countries they
+touch are recomputed (each university's first valid International Students value,
+and the Female % means per university and per country). The result is identical to
+cleaning the combined CSV from scratch, and is stored under its fingerprint, so the
+dashboard loads it without a rebuild after a restart.
+
+Caches are invalidated by what changed: stored k-NN peer graphs are extended with
+the new year (unchanged years keep their neighbour lists), and cached model results
+are keyed by the content of their selection, so only selections that include a
+changed year are recomputed.
+"""
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import data_processing
+import knn_graph
+from data_processing import (DATA_PATH, IMPUTATION_COLS, clean_frame, data_fingerprint, impute,
+                             parse_rows, _cache_path, _write_cache)
+from knn_graph import CURRENT, LOAD_ERRORS, KnnGraph, ensure_graph
+
+# Columns whose values change when a university's or country's statistics change
+IMPUTED_COLS = ['International Students', 'Female %', 'Male %', 'Female Ratio', 'Male Ratio']
+
+
+def load_stored(path=DATA_PATH):
+    """
+    Returns the stored cleaned frame of `path` and its imputation state, rebuilding
+    both from the CSV when they are missing (e.g. a cache written before ingestion
+    support, or a first run).
+    """
+    fingerprint = data_fingerprint(path)
+    try:
+        df = feather.read_table(_cache_path(fingerprint)).to_pandas()
+        state = feather.read_table(_cache_path(fingerprint, 'imputation')).to_pandas()
+        if len(state) == len(df) and list(state.columns) == IMPUTATION_COLS:
+            return df, state
+    except (OSError, pa.ArrowInvalid):
+        pass
+    df, state = clean_frame(pd.read_csv(path))
+    _write_cache(df, _cache_path(fingerprint), state)
+    return df, state
+
+
+def _align(new, header, stored):
+    """
+    The new rows with the combined CSV's column order and the stored dtypes of the
+    columns cleaning passes through unchanged. Returns None when a column would no
+    longer parse to the same dtype over the combined file (e.g. text in a numeric
+    column), which needs a full rebuild.
+    """
+    missing = set(header) - set(new.columns)
+    if missing:
+        raise ValueError(f'New file lacks columns: {sorted(missing)}')
+    new = new[header].copy()
+    for col in header:
+        if col not in stored or col in ('Rank', 'Year', 'International Students', 'Students to Staff Ratio', 'Country'):
+            continue  # Dropped, or parsed by the cleaning whatever the raw dtype
+        if pd.api.types.is_numeric_dtype(stored[col]):
+            if new[col].isna().all():
+                new[col] = new[col].astype(stored[col].dtype if stored[col].dtype.kind == 'f' else float)
+            if not pd.api.types.is_numeric_dtype(new[col]) or \
+                    np.result_type(stored[col].dtype, new[col].dtype) != stored[col].dtype:
+                return None
+            new[col] = new[col].astype(stored[col].dtype)
+    return new
+
+
+def _changed_years(before, after):
+    """Years of the rows whose imputed values differ (NaN equals NaN)."""
+    changed = np.zeros(len(before), dtype=bool)
+    for col in IMPUTED_COLS:
+        old, new = before[col], after.loc[before.index, col]
+        same = (old == new).fillna(False).to_numpy(dtype=bool) | (old.isna() & new.isna()).to_numpy()
+        changed |= ~same
+    return sorted(int(y) for y in before.loc[changed, 'Year'].unique())
+
+
+def ingest(new_path, path=DATA_PATH):
+    """
+    Appends the rows of `new_path` to the combined CSV at `path` and updates the
+    stored cleaned dataset incrementally.
+
+    Returns:
+        dict: Rows added, new years, earlier years whose imputed values changed,
+        the number of universities and countries whose statistics were recomputed,
+        and whether a full rebuild was needed.
+    """
+    df, state = load_stored(path)
+    header = list(pd.read_csv(path, nrows=0).columns)
+    raw = pd.read_csv(new_path)
+    new_years = sorted(int(y) for y in raw['Year'].unique())
+    overlap = sorted(set(new_years) & set(df['Year'].unique()))
+    if overlap:
+        raise ValueError(f'Years already in the dataset: {overlap}. Replace the combined CSV instead.')
+    aligned = _align(raw, header, df)
+
+    # Append to the combined CSV first: if anything below fails, the next load rebuilds
+    with open(path, 'rb+') as f:
+        f.seek(-1, 2)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+    raw[header].to_csv(path, mode='a', header=False, index=False)
+
+    if aligned is None:
+        data_processing.load_cleaned(path)
+        return {'rows': len(raw), 'new_years': new_years, 'changed_years': None,
+                'universities': None, 'countries': None, 'rebuilt': True}
+
+    new_df, new_state = parse_rows(aligned)
+    combined = pd.concat([df, new_df], ignore_index=True)
+    combined_state = pd.concat([state, new_state], ignore_index=True)
+    names = set(new_df['Name'].dropna())
+    countries = set(new_df['Country'].dropna())
+    impute(combined, combined_state, names=names, countries=countries)
+
+    _write_cache(combined, _cache_path(data_fingerprint(path)), combined_state)
+    return {'rows': len(raw), 'new_years': new_years, 'changed_years': _changed_years(df, combined),
+            'universities': len(names), 'countries': len(countries), 'rebuilt': False}
+
+
+def use_cache_dir(path):
+    """Points the cleaned-data cache and the stored k-NN graphs at `path` instead of WUR_CACHE_DIR."""
+    data_processing.CACHE_DIR = Path(path)
+    knn_graph.KNN_DIR = data_processing.CACHE_DIR / 'knn'
+
+
+def update_graphs(df):
+    """Extends every stored k-NN graph with the new rows; returns the updated graph paths."""
+    updated = []
+    for current in sorted(knn_graph.KNN_DIR.glob(f'*/{CURRENT}')):
+        try:
+            graph = KnnGraph.load(current.parent)
+        except LOAD_ERRORS:
+            continue  # Rebuilt on demand by the dashboard
+        ensure_graph(df, graph.metrics, graph.k, graph.method)
+        updated.append(current.parent)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append a new ranking year to the dataset incrementally.')
+    parser.add_argument('files', nargs='+', help='CSV files of new years, with the combined CSV\'s columns')
+    parser.add_argument('--csv', default=DATA_PATH, help='Combined CSV to extend')
+    parser.add_argument('--cache-dir', help='Cache directory of --csv (default WUR_CACHE_DIR); required with a '
+                                            'non-default --csv, whose caches would otherwise replace the dashboard\'s')
+    parser.add_argument('--no-graphs', action='store_true', help='Do not extend the stored k-NN graphs')
+    args = parser.parse_args()
+
+    # The cache keeps one cleaned dataset (writing one deletes the others) and one set of
+    # peer graphs, so another CSV must not share the dashboard's
+    if args.cache_dir:
+        use_cache_dir(args.cache_dir)
+    elif Path(args.csv).resolve() != Path(DATA_PATH).resolve():
+        parser.error('--csv other than the dashboard\'s dataset needs its own --cache-dir')
+
+    for new_path in args.files:
+        try:
+            result = ingest(new_path, args.csv)
+        except ValueError as exc:
+            parser.error(f'{new_path}: {exc}')
+        if result['rebuilt']:
+            print(f"{new_path}: {result['rows']:,} rows for {result['new_years']}; column types changed, "
+                  f'so the dataset was rebuilt in full')
+        else:
+            print(f"{new_path}: {result['rows']:,} rows for {result['new_years']}; recomputed statistics of "
+                  f"{result['universities']:,} universities and {result['countries']} countries; "
+                  f"earlier years with changed imputed values: {result['changed_years'] or 'none'}")
+
+    if not args.no_graphs:
+        df = data_processing.load_cleaned(args.csv)
+        for path in update_graphs(df):
+            print(f'Extended k-NN graph {path}')
+    print('Restart the dashboard (or clear its cache) to load the new data.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+import tracemalloc
+from contextlib import nullcontext
+import streamlit as st
+import pandas as pd
+
+# '1' records wall/CPU time and cache hits per step, 'memory' also traces allocations
+# (tracemalloc slows every allocation, so it is opt-in); anything else disables it
+MODE = os.environ.get('WUR_DIAGNOSTICS', '0').lower()
+ENABLED = MODE in ('1', 'memory')
+TRACE_MEMORY = MODE == 'memory'
+LOG_PATH = os.environ.get('WUR_DIAGNOSTICS_LOG')  # Default: WUR_CACHE_DIR/diagnostics.jsonl
+
+_NULL_STEP = nullcontext()
+_local = threading.local()
+_log_lock = threading.Lock()
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# --- Cache counters ---
+# Counted per thread: Streamlit runs each session's script in its own thread and cached
+# functions compute in the calling thread, so a rerun only sees its own hits and misses.
+def _counts():
+    if not hasattr(_local, 'counts'):
+        _local.counts = {}
+    return _local.counts
+
+
+def count_cache(name, hit):
+    """
+    Records a lookup in a cache for the current rerun's steps.
+
+    Args:
+        name (str): Label shown in the diagnostics panel and the log.
+        hit (bool): Whether the cached value was reused.
+    """
+    if ENABLED:
+        counts = _counts().setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def instrumented_cache(cache_decorator, name=None):
+    """
+    Applies a cache decorator (st.cache_data / st.cache_resource, or functools.lru_cache)
+    and, when diagnostics are enabled, counts its hits and misses; a call that did not
+    run the function body is a hit. When disabled, this is the decorator itself.
+
+    Usage:
+        @instrumented_cache(st.cache_data(show_spinner=False))
+        def expensive(...): ...
+    """
+    def wrap(func):
+        if not ENABLED:
+            return cache_decorator(func)
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            _local.computed = getattr(_local, 'computed', 0) + 1
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            before = getattr(_local, 'computed', 0)
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                count_cache(label, getattr(_local, 'computed', 0) == before)
+
+        for attr in ('clear', 'cache_clear', 'cache_info'):
+            if hasattr(cached, attr):
+                setattr(call, attr, getattr(cached, attr))
+        return call
+    return wrap
+
+
+def _cache_counts():
+    return {name: tuple(counts) for name, counts in _counts().items()}
+
+
+# --- Steps ---
+class _Step:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _stack()
+        self.path = '/'.join([s.name for s in stack] + [self.name])
+        self.depth = len(stack)
+        self.child_peak = 0
+        self.caches = _cache_counts()
+        if TRACE_MEMORY:
+            self.mem_start, parent_peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, parent_peak)
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.cpu_start = time.thread_time()
+        self.process_cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.thread_time() - self.cpu_start
+        process_cpu = time.process_time() - self.process_cpu_start
+        stack = _stack()
+        stack.pop()
+        record = {
+            'run': getattr(_local, 'run', None), 'ts': time.time(), 'step': self.path, 'depth': self.depth,
+            'wall_ms': wall * 1e3, 'cpu_ms': cpu * 1e3, 'process_cpu_ms': process_cpu * 1e3,
+            'alloc_mb': None, 'peak_mb': None,
+        }
+        if TRACE_MEMORY:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.child_peak)
+            record['alloc_mb'] = (current - self.mem_start) / 2**20
+            record['peak_mb'] = (peak - self.mem_start) / 2**20
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        caches = {}
+        for cache, (hits, misses) in _cache_counts().items():
+            hits0, misses0 = self.caches.get(cache, (0, 0))
+            if hits != hits0 or misses != misses0:
+                caches[cache] = [hits - hits0, misses - misses0]
+        record['cache_hits'] = sum(h for h, _ in caches.values())
+        record['cache_misses'] = sum(m for _, m in caches.values())
+        record['caches'] = caches
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        _records().append(record)
+        return False
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _records():
+    if not hasattr(_local, 'records'):
+        _local.records = []
+    return _local.records
+
+
+def step(name):
+    """
+    Context manager timing a step of the current rerun: wall time, CPU time of the
+    rerun's thread, CPU time of the whole process (worker pools, but also other
+    sessions and background threads), the rerun's cache hits/misses and, in 'memory'
+    mode, the net and peak traced allocation (also process-wide). Steps nest; the log
+    shows them as 'outer/inner'. Returns a shared no-op context when diagnostics are disabled.
+    """
+    return _Step(name) if ENABLED else _NULL_STEP
+
+
+# --- Reruns ---
+def begin_run():
+    """Starts collecting the steps of a new rerun of the script."""
+    if ENABLED:
+        _local.run = uuid.uuid4().hex[:12]
+        _local.stack = []
+        _local.records = []
+        _local.counts = {}
+
+
+def end_run():
+    """
+    Appends the rerun's steps to the JSONL log and shows them in the sidebar's
+    Diagnostics panel. Does nothing when diagnostics are disabled.
+    """
+    if not ENABLED:
+        return
+    records = _records()
+    _local.records = []
+    _write_log(records)
+    render_panel(records)
+
+
+def _log_path():
+    if LOG_PATH:
+        return LOG_PATH
+    from data_processing import CACHE_DIR
+    return CACHE_DIR / 'diagnostics.jsonl'
+
+
+def _write_log(records):
+    if not records:
+        return
+    lines = ''.join(json.dumps(r) + '\n' for r in records)
+    path = _log_path()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _log_lock, open(path, 'a') as f:
+            f.write(lines)
+    except OSError:
+        pass  # The panel still shows the rerun
+
+
+def render_panel(records):
+    """
+    Renders the collapsed Diagnostics panel at the bottom of the sidebar.
+
+    Args:
+        records (list): Step records of the rerun, in completion order.
+    """
+    with st.sidebar.expander('🩺 Diagnostics', expanded=False):
+        if not records:
+            st.caption('No steps recorded in this rerun.')
+            return
+        table = pd.DataFrame(sorted(records, key=lambda r: r['ts'] - r['wall_ms'] / 1e3))
+        table['step'] = [' ' * d + s.rsplit('/', 1)[-1] for d, s in zip(table['depth'], table['step'])]
+        cols = ['step', 'wall_ms', 'cpu_ms', 'process_cpu_ms', 'cache_hits', 'cache_misses']
+        if TRACE_MEMORY:
+            cols += ['alloc_mb', 'peak_mb']
+        st.dataframe(table[cols].round(1), hide_index=True, use_container_width=True)
+        top = table[table['depth'] == 0]
+        st.caption(f"Rerun {records[-1]['run']}: {top['wall_ms'].sum():,.0f} ms wall, "
+                   f"{top['cpu_ms'].sum():,.0f} ms CPU in this session's thread, "
+                   f"{top['process_cpu_ms'].sum():,.0f} ms CPU process-wide (worker threads, other "
+                   f"sessions). Log: {_log_path()}")
+        misses = {c: v for r in records if r['depth'] == 0 for c, v in r['caches'].items() if v[1]}
+        if misses:
+            st.caption('Recomputed: ' + ', '.join(sorted(misses)))
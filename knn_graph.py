@@ -0,0 +1,423 @@
+"""
+k-nearest-neighbour graph over every (university, year) row, per metric set.
+
+Build or extend the stored graph offline from the repository root:
+    python knn_graph.py --k 20
+
+The dashboard never builds a graph inside a request: start_knn_graph() loads a
+current stored graph, or builds it in a background thread while the page says so.
+The warm-up (warmup.py) starts the default metric set's graph when the server starts.
+"""
+import os
+import time
+import shutil
+import zipfile
+import threading
+import argparse
+import json
+import hashlib
+import streamlit as st
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from data_processing import CACHE_DIR, load_cleaned, load_data
+from instrumentation import instrumented_cache
+from warmup import configure_numba_cache
+
+KNN_DIR = CACHE_DIR / 'knn'
+DEFAULT_METRICS = ['Overall Score', 'Teaching', 'Research Environment', 'Research Quality', 'Industry Impact']
+ALL_SCOPE = 'All'
+CURRENT = 'CURRENT'  # Names the version directory holding a graph's latest complete files
+# What loading a missing, stale or damaged stored graph can raise
+LOAD_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile)
+
+
+def _year_hashes(data, metrics):
+    """Content hash of the graph inputs for each year, used to detect changed years."""
+    cols = ['Name', 'Country', 'Continent', 'Year'] + list(metrics)
+    hashes = pd.util.hash_pandas_object(data[cols].astype({'Name': str, 'Country': str, 'Continent': str}), index=False)
+    return {int(y): hashlib.sha1(h.to_numpy().tobytes()).hexdigest()
+            for y, h in hashes.groupby(data['Year'].to_numpy())}
+
+
+class KnnGraph:
+    """
+    Precomputed nearest peers for every (university, year) row.
+
+    Metrics are standardized and L2-normalized, so similarity is the cosine
+    similarity used by the twin network. For each row the graph keeps the k most
+    similar rows of *other* universities, once over all rows (scope 'All') and once
+    per continent, each as an n x n CSR matrix whose values are similarities in %.
+    Neighbours are found exactly (chunked brute force) or approximately
+    (pynndescent, which umap-learn already installs).
+    """
+
+    def __init__(self, keys, X, scaler, metrics, k, method, graphs, year_hashes):
+        self.keys = keys.reset_index(drop=True)
+        self.X = X
+        self.scaler = scaler
+        self.metrics = list(metrics)
+        self.k = k
+        self.method = method
+        self.graphs = graphs
+        self.year_hashes = year_hashes
+        self._names = self.keys['Name'].to_numpy()
+        self._rows_by_name = pd.Series(np.arange(len(self.keys))).groupby(self._names).apply(list).to_dict()
+
+    # --- Construction ---
+
+    @staticmethod
+    def _prepare(df, metrics):
+        data = df.dropna(subset=metrics)
+        keys = data[['Name', 'Country', 'Continent', 'Year']].astype(
+            {'Name': str, 'Country': str, 'Continent': str, 'Year': int})
+        return data, keys
+
+    @staticmethod
+    def _features(values, scaler):
+        X = (values - scaler['mean']) / scaler['scale']
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        return np.divide(X, norms, out=np.zeros_like(X), where=norms > 0).astype(np.float32)
+
+    @classmethod
+    def build(cls, df, metrics=DEFAULT_METRICS, k=20, method='exact'):
+        """Builds the graph from scratch over every row of `df` with complete metrics."""
+        data, keys = cls._prepare(df, metrics)
+        values = data[metrics].to_numpy(dtype=float)
+        scale = values.std(axis=0)
+        scaler = {'mean': values.mean(axis=0), 'scale': np.where(scale > 0, scale, 1.0)}
+        graph = cls(keys, cls._features(values, scaler), scaler, metrics, k, method, {}, _year_hashes(data, metrics))
+        everything = np.arange(len(keys))
+        for scope, members in graph._scopes(everything).items():
+            idx, sim = graph._neighbours(everything, members)
+            graph.graphs[scope] = graph._to_csr(idx, sim)
+        return graph
+
+    def _scopes(self, rows):
+        """Candidate rows per scope: all rows, then the rows of each continent."""
+        continents = self.keys['Continent'].to_numpy()[rows]
+        scopes = {ALL_SCOPE: rows}
+        for continent in sorted(set(continents)):
+            scopes[continent] = rows[continents == continent]
+        return scopes
+
+    def _neighbours(self, queries, candidates, chunk=2048):
+        """
+        For each query row, the k most similar candidate rows of other universities,
+        as padded (positions, similarities) arrays sorted by similarity; pads are -1.
+        """
+        # Other years of the same university are excluded, so look a little further
+        extra = int(pd.Series(self._names[candidates]).value_counts().max()) if len(candidates) else 0
+        kq = min(self.k + extra, len(candidates))
+        idx = np.full((len(queries), self.k), -1, dtype=np.int64)
+        sim = np.full((len(queries), self.k), np.nan, dtype=np.float32)
+        if kq == 0:
+            return idx, sim
+
+        if self.method == 'approx' and len(candidates) > 4 * kq:
+            configure_numba_cache()
+            from pynndescent import NNDescent
+            index = NNDescent(self.X[candidates], metric='cosine', n_neighbors=max(kq, 15), random_state=42)
+            found, dist = index.query(self.X[queries], k=kq)
+            top_pos, top_sim = candidates[found], 1 - dist
+        else:
+            top_pos = np.empty((len(queries), kq), dtype=np.int64)
+            top_sim = np.empty((len(queries), kq), dtype=np.float32)
+            B = self.X[candidates]
+            for start in range(0, len(queries), chunk):
+                sims = self.X[queries[start:start + chunk]] @ B.T
+                part = np.argpartition(-sims, kq - 1, axis=1)[:, :kq]
+                part_sims = np.take_along_axis(sims, part, axis=1)
+                order = np.argsort(-part_sims, axis=1, kind='stable')
+                top_pos[start:start + chunk] = candidates[np.take_along_axis(part, order, axis=1)]
+                top_sim[start:start + chunk] = np.take_along_axis(part_sims, order, axis=1)
+
+        # Stable sort moves the rows of other universities to the front, keeping their order
+        other = self._names[top_pos] != self._names[queries][:, np.newaxis]
+        keep = np.argsort(~other, axis=1, kind='stable')[:, :self.k]
+        width = keep.shape[1]
+        valid = np.take_along_axis(other, keep, axis=1)
+        idx[:, :width] = np.where(valid, np.take_along_axis(top_pos, keep, axis=1), -1)
+        sim[:, :width] = np.where(valid, np.take_along_axis(top_sim, keep, axis=1) * 100, np.nan)
+        return idx, sim
+
+    def _to_csr(self, idx, sim):
+        n = len(self.keys)
+        valid = idx >= 0
+        indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        return sp.csr_matrix((sim[valid], idx[valid], indptr), shape=(len(idx), n))
+
+    def _padded(self, scope):
+        """The stored neighbours of a scope as padded (positions, similarities) arrays."""
+        G = self.graphs[scope]
+        idx = np.full((G.shape[0], self.k), -1, dtype=np.int64)
+        sim = np.full((G.shape[0], self.k), np.nan, dtype=np.float32)
+        for i in range(G.shape[0]):
+            lo, hi = G.indptr[i], G.indptr[i + 1]
+            idx[i, :hi - lo] = G.indices[lo:hi]
+            sim[i, :hi - lo] = G.data[lo:hi]
+        return idx, sim
+
+    def extend(self, df):
+        """
+        Adds the rows of years not yet in the graph (e.g. a new ranking year) without
+        recomputing the existing neighbour lists: new rows are searched against every
+        row, and existing rows only against the new rows, keeping the k best overall.
+        Features reuse the scaler of the original build, so neighbours stay comparable.
+        """
+        data, keys = self._prepare(df, self.metrics)
+        new_years = sorted(set(keys['Year']) - set(self.year_hashes))
+        if not new_years:
+            return self
+        new = keys['Year'].isin(new_years).to_numpy()
+        data, keys = data[new], keys[new]
+
+        n_old = len(self.keys)
+        old_rows = np.arange(n_old)
+        new_rows = np.arange(n_old, n_old + len(keys))
+        self.keys = pd.concat([self.keys, keys], ignore_index=True)
+        self.X = np.vstack([self.X, self._features(data[self.metrics].to_numpy(dtype=float), self.scaler)])
+        self._names = self.keys['Name'].to_numpy()
+        self._rows_by_name = pd.Series(np.arange(len(self.keys))).groupby(self._names).apply(list).to_dict()
+
+        everything = np.arange(len(self.keys))
+        new_scopes = self._scopes(new_rows)
+        for scope, members in self._scopes(everything).items():
+            idx_new, sim_new = self._neighbours(new_rows, members)
+            if scope in self.graphs:
+                idx_old, sim_old = self._padded(scope)
+            else:
+                idx_old = np.full((n_old, self.k), -1, dtype=np.int64)
+                sim_old = np.full((n_old, self.k), np.nan, dtype=np.float32)
+            if scope in new_scopes:
+                cand_idx, cand_sim = self._neighbours(old_rows, new_scopes[scope])
+                merged_idx = np.hstack([idx_old, cand_idx])
+                merged_sim = np.nan_to_num(np.hstack([sim_old, cand_sim]), nan=-np.inf)
+                order = np.argsort(-merged_sim, axis=1, kind='stable')[:, :self.k]
+                idx_old = np.take_along_axis(merged_idx, order, axis=1)
+                sim_old = np.take_along_axis(merged_sim, order, axis=1)
+                sim_old[idx_old < 0] = np.nan
+            self.graphs[scope] = self._to_csr(np.vstack([idx_old, idx_new]), np.vstack([sim_old, sim_new]))
+
+        self.year_hashes.update(_year_hashes(data, self.metrics))
+        return self
+
+    # --- Persistence ---
+
+    @staticmethod
+    def path_for(metrics, k, method):
+        tag = hashlib.sha1(repr((sorted(metrics), k, method)).encode()).hexdigest()[:12]  # Order-independent
+        return KNN_DIR / tag
+
+    def save(self, path=None):
+        """
+        Writes the graph to a new version directory under `path`, then points
+        `path`/CURRENT at it, so readers (and other processes saving the same graph)
+        only ever load a complete version. Older versions are removed, except the one
+        just replaced, which a reader may still be loading.
+        """
+        path = path or self.path_for(self.metrics, self.k, self.method)
+        path.mkdir(parents=True, exist_ok=True)
+        version = f'v{time.time_ns()}-{os.getpid()}'
+        tmp = path / f'.{version}.tmp'
+        tmp.mkdir()
+        self.keys.to_feather(tmp / 'keys.arrow')
+        np.save(tmp / 'features.npy', self.X)
+        for i, (scope, G) in enumerate(self.graphs.items()):
+            sp.save_npz(tmp / f'graph-{i}.npz', G)
+        meta = {
+            'metrics': self.metrics, 'k': self.k, 'method': self.method,
+            'scopes': list(self.graphs), 'year_hashes': self.year_hashes,
+            'scaler': {name: values.tolist() for name, values in self.scaler.items()},
+        }
+        (tmp / 'meta.json').write_text(json.dumps(meta, indent=1))
+        os.replace(tmp, path / version)
+
+        pointer = path / f'.{CURRENT}.{os.getpid()}.tmp'
+        pointer.write_text(version)
+        os.replace(pointer, path / CURRENT)
+        for old in sorted(d for d in path.glob('v*') if d.name < version)[:-1]:
+            shutil.rmtree(old, ignore_errors=True)
+        for stale in path.glob('*.*'):
+            if stale.is_file():
+                stale.unlink(missing_ok=True)  # Files of the earlier, unversioned layout
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Loads the current version of the graph stored under `path` (may raise LOAD_ERRORS)."""
+        path = path / (path / CURRENT).read_text().strip()
+        meta = json.loads((path / 'meta.json').read_text())
+        keys = pd.read_feather(path / 'keys.arrow')
+        graphs = {scope: sp.load_npz(path / f'graph-{i}.npz').tocsr() for i, scope in enumerate(meta['scopes'])}
+        scaler = {name: np.array(values) for name, values in meta['scaler'].items()}
+        year_hashes = {int(y): h for y, h in meta['year_hashes'].items()}
+        return cls(keys, np.load(path / 'features.npy'), scaler, meta['metrics'], meta['k'],
+                   meta['method'], graphs, year_hashes)
+
+    # --- Queries ---
+
+    def row_of(self, name, year=None):
+        """Row position of `name` in `year`, or its latest row; None if absent."""
+        rows = self._rows_by_name.get(name)
+        if not rows:
+            return None
+        if year is None:
+            return max(rows, key=lambda r: self.keys.at[r, 'Year'])
+        matches = [r for r in rows if self.keys.at[r, 'Year'] == year]
+        return matches[0] if matches else None
+
+    def years_of(self, name):
+        return sorted(self.keys.loc[self._rows_by_name.get(name, []), 'Year'].tolist())
+
+    def _frame(self, rows, sims):
+        out = self.keys.loc[rows, ['Name', 'Country', 'Continent', 'Year']].reset_index(drop=True)
+        out['Similarity'] = sims
+        return out
+
+    def peers(self, name, year=None, scope=ALL_SCOPE, k=None):
+        """The closest rows of other universities, anywhere or within one continent."""
+        row = self.row_of(name, year)
+        if row is None or scope not in self.graphs:
+            return self._frame([], [])
+        G = self.graphs[scope]
+        lo, hi = G.indptr[row], G.indptr[row + 1]
+        order = np.argsort(-G.data[lo:hi], kind='stable')[:k or self.k]
+        return self._frame(G.indices[lo:hi][order], G.data[lo:hi][order])
+
+    def mutual_twins(self, name, year=None):
+        """Peers that also list this university-year among their own k closest rows."""
+        row = self.row_of(name, year)
+        if row is None:
+            return self._frame([], [])
+        G = self.graphs[ALL_SCOPE]
+        lo, hi = G.indptr[row], G.indptr[row + 1]
+        cols, sims = G.indices[lo:hi], G.data[lo:hi]
+        back = np.array([row in G.indices[G.indptr[c]:G.indptr[c + 1]] for c in cols], dtype=bool)
+        order = np.argsort(-sims[back], kind='stable')
+        return self._frame(cols[back][order], sims[back][order])
+
+
+def ensure_graph(df, metrics=DEFAULT_METRICS, k=20, method='exact', rebuild=False):
+    """
+    Loads the stored graph for this metric set, extending it with new years when only
+    years were added, and rebuilding it when stored years changed or it is missing.
+    The metrics are used in sorted order, so any order of the same set shares a graph.
+    """
+    metrics = sorted(metrics)
+    path = KnnGraph.path_for(metrics, k, method)
+    data, _ = KnnGraph._prepare(df, metrics)
+    current = _year_hashes(data, metrics)
+    graph = None
+    if not rebuild:
+        try:
+            graph = KnnGraph.load(path)
+        except LOAD_ERRORS:
+            graph = None
+    if graph is not None and all(current.get(y) == h for y, h in graph.year_hashes.items()):
+        if set(current) == set(graph.year_hashes):
+            return graph
+        graph.extend(df)
+    else:
+        graph = KnnGraph.build(df, metrics, k, method)
+    try:
+        graph.save(path)
+    except OSError:
+        pass  # The in-memory graph is still usable
+    return graph
+
+
+def load_graph(df, metrics=DEFAULT_METRICS, k=20, method='exact'):
+    """The stored graph for this metric set if it covers exactly the rows of `df`, else None."""
+    metrics = sorted(metrics)
+    data, _ = KnnGraph._prepare(df, metrics)
+    try:
+        graph = KnnGraph.load(KnnGraph.path_for(metrics, k, method))
+    except LOAD_ERRORS:
+        return None
+    return graph if graph.year_hashes == _year_hashes(data, metrics) else None
+
+
+class GraphBuild:
+    """
+    A metric set's graph, loaded from the store when current and otherwise built
+    (or extended) in a background thread by ensure_graph(). The state is 'running'
+    until `graph` is available ('done'), or 'failed'.
+    """
+
+    def __init__(self, metrics, k=20, method='exact'):
+        self.metrics = sorted(metrics)
+        self.k = k
+        self.method = method
+        self.state = 'idle'
+        self.graph = None
+        self.started = None
+        self.elapsed = None
+        self.error = None
+        self._thread = None
+
+    def start(self, df):
+        self.started = time.time()
+        self.graph = load_graph(df, self.metrics, self.k, self.method)
+        if self.graph is not None:
+            self.state = 'done'
+            self.elapsed = time.time() - self.started
+        else:
+            self.state = 'running'
+            self._thread = threading.Thread(target=self._run, args=(df,), name='knn-graph', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, df):
+        try:
+            self.graph = ensure_graph(df, self.metrics, self.k, self.method)
+            self.state = 'done'
+        except Exception as exc:  # Shown in the tab; the rest of the page is unaffected
+            self.error = f'{type(exc).__name__}: {exc}'
+            self.state = 'failed'
+        finally:
+            self.elapsed = time.time() - self.started
+
+    def wait(self, timeout=None):
+        """Blocks until the graph is available (or `timeout` seconds passed); returns True if done."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == 'done'
+
+
+_retry_lock = threading.Lock()
+
+
+@instrumented_cache(st.cache_resource(show_spinner=False))  # Also called from the warm-up thread
+def _knn_graph(metrics, k, method):
+    return GraphBuild(metrics, k, method).start(load_data())
+
+
+def start_knn_graph(metrics, k=20, method='exact'):
+    """
+    The GraphBuild of a metric set (in any order), started once per process: done
+    at once when a current graph is stored, otherwise building in the background.
+    A failed build is returned once and then dropped, so the next call retries.
+    """
+    key = (tuple(sorted(metrics)), k, method)
+    with _retry_lock:  # One caller drops a failed build, and later ones get its successor
+        build = _knn_graph(*key)
+        if build.state == 'failed':
+            _knn_graph.clear(*key)
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or extend the stored k-NN peer graph.')
+    parser.add_argument('--metrics', nargs='+', default=DEFAULT_METRICS)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--method', choices=['exact', 'approx'], default='exact')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the stored graph and rebuild it')
+    args = parser.parse_args()
+    graph = ensure_graph(load_cleaned(), args.metrics, args.k, args.method, args.rebuild)
+    print(f'{len(graph.keys):,} rows, {len(graph.graphs)} scopes, '
+          f'{sum(G.nnz for G in graph.graphs.values()):,} edges -> {KnnGraph.path_for(args.metrics, args.k, args.method)}')
+
+
+if __name__ == '__main__':
+    main()
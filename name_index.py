@@ -0,0 +1,132 @@
+import re
+import unicodedata
+import streamlit as st
+import numpy as np
+from data_processing import load_data
+from instrumentation import instrumented_cache
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """Case- and diacritics-insensitive form of a name: 'Université de Montréal' -> 'universite de montreal'."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def _grams(text, partial_last=False):
+    """
+    Trigrams of the words of a normalized string, each word padded as '  word '.
+    With `partial_last`, the last word gets no end padding (it may still be typed).
+    """
+    grams = set()
+    words = text.split()
+    for n, word in enumerate(words):
+        padded = f'  {word}' if partial_last and n == len(words) - 1 else f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _inner_grams(text):
+    """Unpadded trigrams inside the words of `text`; any name containing `text` has them all."""
+    return {word[i:i + 3] for word in text.split() for i in range(len(word) - 2)}
+
+
+class NameIndex:
+    """
+    Search index over the distinct university names of a dataset.
+
+    Holds the canonical sorted name and country lists used by every picker, and a
+    trigram index of the words of the normalized names. A query is scored against
+    all names with one bincount over the postings of its trigrams; substring
+    candidates are the names sharing every trigram inside the query's words,
+    verified with a vectorized string search.
+    """
+
+    def __init__(self, df):
+        self.names = sorted(df['Name'].dropna().astype(str).unique())
+        self.countries = sorted(df['Country'].dropna().astype(str).unique())
+        self._norm = np.array([normalize(n) for n in self.names])
+        self._padded = np.char.add(' ', self._norm)
+
+        postings = {}
+        n_grams = np.empty(len(self.names), dtype=np.int32)
+        for i, norm in enumerate(self._norm):
+            grams = _grams(norm)
+            n_grams[i] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._n_grams = n_grams
+
+    def __len__(self):
+        return len(self.names)
+
+    def _shared(self, grams):
+        """Number of `grams` each name contains."""
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return np.zeros(len(self.names), dtype=np.int64)
+        return np.bincount(np.concatenate(hits), minlength=len(self.names))
+
+    def _substring_ids(self, q):
+        """Ids of the names whose normalized form contains the normalized query `q`."""
+        inner = _inner_grams(q)
+        if inner:
+            candidates = np.flatnonzero(self._shared(inner) == len(inner))
+        else:
+            candidates = np.arange(len(self.names))
+        return candidates[np.char.find(self._norm[candidates], q) >= 0]
+
+    def matches(self, query):
+        """
+        Boolean mask over `names`: True where the name contains `query`, ignoring
+        case, accents and punctuation. An empty query matches every name.
+        """
+        q = normalize(query)
+        mask = np.zeros(len(self.names), dtype=bool)
+        if not q:
+            mask[:] = True
+        else:
+            mask[self._substring_ids(q)] = True
+        return mask
+
+    def search(self, query, limit=20, min_similarity=0.5):
+        """
+        Ranked fuzzy lookup.
+
+        Args:
+            query (str): Free text; case, accents and punctuation are ignored.
+            limit (int): Maximum number of names returned.
+            min_similarity (float): Share of the query's trigrams a name must contain
+                when it does not contain the query itself.
+
+        Returns:
+            list: Names, best first: exact match, prefix match, word-prefix match,
+            substring match, then the closest trigram matches (misspellings).
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        grams = _grams(q, partial_last=True)
+        shared = self._shared(grams)
+        coverage = shared / len(grams)
+        jaccard = shared / (len(grams) + self._n_grams - shared)  # Prefers closer, shorter names
+
+        tier = np.zeros(len(self.names))
+        ids = self._substring_ids(q)
+        norm = self._norm[ids]
+        tier[ids] = np.select(
+            [norm == q, np.char.startswith(norm, q), np.char.find(self._padded[ids], ' ' + q) >= 0],
+            [4, 3, 2], default=1)
+        keep = np.flatnonzero((tier > 0) | (coverage >= min_similarity))
+        # Best tier, then trigram coverage and closeness; ties stay alphabetical
+        order = keep[np.lexsort((keep, -jaccard[keep], -(tier[keep] + coverage[keep])))][:limit]
+        return [self.names[i] for i in order]
+
+
+@instrumented_cache(st.cache_resource)
+def get_name_index():
+    """Builds the name index once per process over the loaded dataset."""
+    return NameIndex(load_data())
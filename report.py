@@ -0,0 +1,382 @@
+"""
+Headless batch report: runs the dashboard sections for a list of filter presets
+without a Streamlit server and writes what each section shows to disk.
+
+    python report.py --out reports
+    python report.py --presets presets.json --sections Overview EDA --jobs 4
+
+For every preset and section, REPORT_DIR/<preset>/<section>/ holds the figures as
+JSON and standalone HTML, the tables as Parquet, images as PNG, a section.json
+manifest listing every element in page order, and an index.html page.
+
+A presets file is a JSON list of objects such as
+    {"name": "japan-2025", "year": 2025, "countries": ["Japan"],
+     "rank_range": [1, 500], "score_range": [0, 100],
+     "widgets": {"twin_top_k": 5, "Number of Clusters (k)": 4}}
+where "year" is a year, null for all years or "latest"; omitted filters take the
+sidebar defaults. Widgets keep their dashboard defaults unless "widgets" sets them
+(by key, or by label for widgets without a key).
+"""
+import argparse
+import html
+import io
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from plotly.offline import get_plotlyjs_version
+import streamlit as st
+import streamlit.logger
+from filters import get_filter_engine
+from stats_cube import get_stats_cube
+from data_processing import load_data
+from sections import SELECTED_VARS, TAB_TITLES, SCORE_RANGE, filtered_view, load_section, section_renderers
+
+REPORT_DIR = Path('reports')
+
+# The dashboard's initial view (latest year) and the all-years view
+DEFAULT_PRESETS = [
+    {'name': 'latest-year', 'year': 'latest'},
+    {'name': 'all-years', 'year': None},
+]
+# Reports include the sections' optional content
+DEFAULT_WIDGETS = {'map_show_intl': True, 'map_show_female': True}
+
+PLOTLY_CDN = f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+
+
+class Recorder:
+    """
+    Stand-in for the `streamlit` module inside tabs/*.py.
+
+    Output calls (text, charts, tables, metrics, images) are recorded in page order.
+    Widgets return their preset value (looked up by key, then by label) or the same
+    default the dashboard shows on first load. Layout calls return the recorder
+    itself, so `with col:` and `col.metric(...)` record into the same page; cache
+    decorators and anything else fall through to Streamlit.
+    """
+
+    def __init__(self, widgets=None):
+        self.elements = []
+        self.widgets = dict(widgets or {})
+        self.session_state = {}
+
+    def __getattr__(self, name):
+        return getattr(st, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    # --- Layout ---
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def tabs(self, titles):
+        return [self] * len(titles)
+
+    def expander(self, *args, **kwargs):
+        return self
+
+    def container(self, *args, **kwargs):
+        return self
+
+    def spinner(self, *args, **kwargs):
+        return self
+
+    # --- Output ---
+    def _text(self, kind, body):
+        self.elements.append({'type': 'text', 'kind': kind, 'body': str(body)})
+
+    def title(self, body, **kwargs):
+        self._text('title', body)
+
+    def header(self, body, **kwargs):
+        self._text('header', body)
+
+    def subheader(self, body, **kwargs):
+        self._text('subheader', body)
+
+    def markdown(self, body, **kwargs):
+        self._text('markdown', body)
+
+    def caption(self, body, **kwargs):
+        self._text('caption', body)
+
+    def info(self, body, **kwargs):
+        self._text('info', body)
+
+    def success(self, body, **kwargs):
+        self._text('success', body)
+
+    def warning(self, body, **kwargs):
+        self._text('warning', body)
+
+    def error(self, body, **kwargs):
+        self._text('error', body)
+
+    def write(self, *args, **kwargs):
+        for arg in args:
+            if isinstance(arg, pd.DataFrame):
+                self.dataframe(arg)
+            else:
+                self._text('write', arg)
+
+    def plotly_chart(self, figure, **kwargs):
+        self.elements.append({'type': 'figure', 'figure': figure})
+
+    def dataframe(self, data=None, **kwargs):
+        data = getattr(data, 'data', data)  # pandas Styler -> its frame
+        self.elements.append({'type': 'table', 'table': pd.DataFrame(data)})
+
+    table = dataframe
+
+    def metric(self, label, value, delta=None, **kwargs):
+        self.elements.append({'type': 'metric', 'label': str(label), 'value': str(value),
+                              'delta': None if delta is None else str(delta)})
+
+    def image(self, image, **kwargs):
+        self.elements.append({'type': 'image', 'png': image})
+
+    def pyplot(self, fig=None, **kwargs):
+        import matplotlib.pyplot as plt
+        fig = fig or plt.gcf()
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+        plt.close(fig)
+        self.image(buf.getvalue())
+
+    # --- Widgets ---
+    def _widget(self, label, key, default):
+        value = self.widgets.get(key, self.widgets.get(label, default)) if key or label else default
+        self.elements.append({'type': 'widget', 'label': str(label), 'key': key, 'value': value})
+        return value
+
+    def selectbox(self, label, options, index=0, *args, key=None, **kwargs):
+        options = list(options)
+        return self._widget(label, key, options[index] if options and index is not None else None)
+
+    def radio(self, label, options, index=0, *args, key=None, **kwargs):
+        options = list(options)
+        return self._widget(label, key, options[index] if options and index is not None else None)
+
+    def multiselect(self, label, options, default=None, *args, key=None, **kwargs):
+        if default is None:
+            default = []
+        elif isinstance(default, (str, int, float)):
+            default = [default]
+        return self._widget(label, key, list(default))
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, key=None, **kwargs):
+        return self._widget(label, key, min_value if value is None else value)
+
+    def checkbox(self, label, value=False, *args, key=None, **kwargs):
+        return self._widget(label, key, value)
+
+    toggle = checkbox
+
+    def text_input(self, label, value='', *args, key=None, **kwargs):
+        return self._widget(label, key, value)
+
+    def number_input(self, label, min_value=None, max_value=None, value='min', *args, key=None, **kwargs):
+        if value == 'min':
+            value = min_value if min_value is not None else 0.0
+        return self._widget(label, key, value)
+
+    def button(self, label, *args, key=None, **kwargs):
+        return self._widget(label, key, False)
+
+
+@contextmanager
+def recording(recorder):
+    """Points `st` in every loaded tabs.* module at `recorder` for the duration."""
+    patched = {name: module for name, module in sys.modules.items()
+               if name.startswith('tabs.') and getattr(module, 'st', None) is st}
+    for module in patched.values():
+        module.st = recorder
+    try:
+        yield recorder
+    finally:
+        for module in patched.values():
+            module.st = st
+
+
+def slug(text):
+    return re.sub(r'[^0-9a-z]+', '-', text.lower()).strip('-')
+
+
+def preset_view(engine, preset):
+    """Filtered frame for a preset (see the module docstring for the fields)."""
+    year = preset.get('year')
+    if year == 'latest':
+        year = engine.years[-1]
+    rank_range = preset.get('rank_range')
+    return filtered_view(
+        engine,
+        year=None if year is None else int(year),
+        countries=tuple(preset.get('countries', ())),
+        rank_range=tuple(rank_range) if rank_range is not None else None,
+        score_range=tuple(preset.get('score_range', SCORE_RANGE)),
+    )
+
+
+def _write_table(table, path):
+    """Writes a table as Parquet, or as CSV if Arrow cannot represent its columns."""
+    table = table.copy()
+    table.columns = [str(c) for c in table.columns]
+    try:
+        table.to_parquet(path.with_suffix('.parquet'))
+        return path.with_suffix('.parquet').name
+    except (pa.ArrowException, ValueError, TypeError):
+        table.to_csv(path.with_suffix('.csv'))
+        return path.with_suffix('.csv').name
+
+
+def _html_page(title, blocks):
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<script src="{PLOTLY_CDN}"></script></head>\n<body>\n<h1>{html.escape(title)}</h1>\n'
+            + '\n'.join(blocks) + '\n</body></html>\n')
+
+
+def write_section(elements, out_dir, title, inline_js=False):
+    """
+    Writes recorded elements to `out_dir` and returns the manifest.
+
+    Args:
+        elements (list): Recorder.elements.
+        out_dir (Path): Section output directory.
+        title (str): Section title for the HTML page.
+        inline_js (bool): Embed plotly.js in every figure HTML instead of loading it from the CDN.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest, blocks, counts = [], [], {'figure': 0, 'table': 0, 'image': 0}
+    for element in elements:
+        kind = element['type']
+        if kind in counts:
+            counts[kind] += 1
+            stem = out_dir / f'{kind}-{counts[kind]:02d}'
+        if kind == 'figure':
+            fig = element['figure']
+            fig.write_json(stem.with_suffix('.json'))
+            fig.write_html(stem.with_suffix('.html'), include_plotlyjs=True if inline_js else 'cdn')
+            manifest.append({'type': kind, 'title': fig.layout.title.text,
+                             'json': stem.with_suffix('.json').name, 'html': stem.with_suffix('.html').name})
+            blocks.append(fig.to_html(full_html=False, include_plotlyjs=False))
+        elif kind == 'table':
+            table = element['table']
+            manifest.append({'type': kind, 'file': _write_table(table, stem), 'rows': len(table)})
+            blocks.append(table.head(200).to_html(border=0))
+        elif kind == 'image':
+            stem.with_suffix('.png').write_bytes(element['png'])
+            manifest.append({'type': kind, 'file': stem.with_suffix('.png').name})
+            blocks.append(f'<img src="{stem.with_suffix(".png").name}" style="max-width:100%">')
+        elif kind == 'metric':
+            manifest.append(element)
+            delta = f' ({html.escape(element["delta"])})' if element['delta'] else ''
+            blocks.append(f'<p><b>{html.escape(element["label"])}</b>: {html.escape(element["value"])}{delta}</p>')
+        elif kind == 'widget':
+            manifest.append(element)
+        else:
+            manifest.append(element)
+            tag = {'title': 'h1', 'header': 'h2', 'subheader': 'h3'}.get(element['kind'], 'p')
+            if element['body'].strip() != '---':
+                blocks.append(f'<{tag}>{html.escape(element["body"])}</{tag}>')
+
+    (out_dir / 'section.json').write_text(json.dumps(manifest, indent=1, default=_json_default))
+    (out_dir / 'index.html').write_text(_html_page(title, blocks), encoding='utf-8')
+    return manifest
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (tuple, set, np.ndarray)):
+        return list(value)
+    return str(value)
+
+
+def render_section(preset, title, widgets=None, engine=None, cube=None):
+    """
+    Runs one dashboard section for a preset and returns the recorded elements.
+
+    Args:
+        preset (dict): Filter preset (see the module docstring).
+        title (str): A TAB_TITLES entry.
+        widgets (dict): Widget values overriding the defaults.
+        engine (FilterEngine): Dataset to render; defaults to the loaded dataset.
+        cube (StatsCube): Statistics of the same dataset.
+    """
+    engine = engine or get_filter_engine()
+    cube = cube or get_stats_cube()
+    df = preset_view(engine, preset)
+    render = dict(zip(TAB_TITLES, section_renderers(df, engine.df, cube, engine)))[title]
+    load_section(title)  # Import before recording() patches the loaded tabs.* modules
+    with recording(Recorder(widgets)) as recorder:
+        render()
+    return recorder.elements
+
+
+def run_job(preset, title, out_dir, inline_js=False):
+    """Renders and writes one (preset, section) pair; returns a summary row."""
+    start = time.perf_counter()
+    widgets = {**DEFAULT_WIDGETS, **preset.get('widgets', {})}
+    elements = render_section(preset, title, widgets)
+    section_dir = Path(out_dir) / slug(preset['name']) / slug(title)
+    write_section(elements, section_dir, f"{title} — {preset['name']}", inline_js)
+    return {
+        'preset': preset['name'], 'section': title, 'path': str(section_dir),
+        'figures': sum(e['type'] == 'figure' for e in elements),
+        'tables': sum(e['type'] == 'table' for e in elements),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def quiet_streamlit():
+    """Silences Streamlit's missing-runtime warnings, logged on every widget and cache call."""
+    st.get_option('logger.level')  # Parsing the config resets the level, so parse it first
+    streamlit.logger.set_log_level('error')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render dashboard sections to static files for filter presets.')
+    parser.add_argument('--out', type=Path, default=REPORT_DIR, help='Output directory (default: reports).')
+    parser.add_argument('--presets', type=Path, help='JSON file with a list of presets (default: latest year and all years).')
+    parser.add_argument('--sections', nargs='+', choices=TAB_TITLES, default=TAB_TITLES, metavar='SECTION',
+                        help='Sections to render (default: all).')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes (default: CPU count; 1 runs inline).')
+    parser.add_argument('--inline-js', action='store_true', help='Embed plotly.js in each figure HTML file.')
+    args = parser.parse_args(argv)
+
+    quiet_streamlit()
+    presets = json.loads(args.presets.read_text()) if args.presets else DEFAULT_PRESETS
+    jobs = [(preset, title) for preset in presets for title in args.sections]
+
+    start = time.perf_counter()
+    if 'Advanced Insights' in args.sections:
+        # Build the stored peer graph once here rather than in every worker
+        from knn_graph import ensure_graph
+        ensure_graph(load_data(), SELECTED_VARS)
+    if args.jobs == 1:
+        results = [run_job(p, t, args.out, args.inline_js) for p, t in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=quiet_streamlit) as pool:
+            futures = [pool.submit(run_job, p, t, args.out, args.inline_js) for p, t in jobs]
+            results = [f.result() for f in futures]
+
+    for r in results:
+        print(f"{r['preset']:>16} | {r['section']:<22} {r['figures']:3d} figures {r['tables']:3d} tables {r['seconds']:7.2f}s")
+    args.out.mkdir(parents=True, exist_ok=True)
+    (args.out / 'index.json').write_text(json.dumps(results, indent=1))
+    print(f'{len(results)} sections in {time.perf_counter() - start:.1f}s -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data_processing import CACHE_DIR
+from instrumentation import count_cache
+
+# Also keep cached results under CACHE_DIR/results so they survive restarts
+DISK_RESULTS = os.environ.get('WUR_RESULT_CACHE_DISK', '0') == '1'
+
+
+def frame_fingerprint(df, columns):
+    """Hashes the row set (index) and the values of `columns` of a DataFrame."""
+    hashed = pd.util.hash_pandas_object(df[list(columns)], index=True).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def make_key(*parts):
+    """Builds a cache key from a fingerprint plus any repr-able parameters."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _size_of(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_size_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size_of(v) for v in value)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache for expensive analytics results (embeddings, labels, fitted
+    models), shared by all sessions of the process.
+
+    Entries are evicted least-recently-used first once either `max_entries` or
+    `max_bytes` is exceeded. With `disk_dir`, entries are also pickled there and
+    looked up on a memory miss; the directory is trimmed to the same bounds.
+    """
+
+    def __init__(self, name, max_entries=16, max_bytes=256 * 2**20, disk_dir=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) / name if disk_dir else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                count_cache(f'results:{self.name}', True)
+                return self._entries[key][0]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count_cache(f'results:{self.name}', value is not None)
+        if value is None:
+            return None
+        self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """Caches `value` under `key`, evicting older entries as needed."""
+        if self._store(key, value):
+            self._write_disk(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, value):
+        size = _size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return True
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f'{key}.pkl'
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)  # Keeps disk eviction least-recently-used
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_dir / f'{key}.pkl'
+            tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self._trim_disk()
+        except OSError:
+            pass  # The in-memory entry is still usable
+
+    def _trim_disk(self):
+        files = sorted(self.disk_dir.glob('*.pkl'), key=lambda p: p.stat().st_mtime, reverse=True)
+        kept, total = 0, 0
+        for path in files:
+            size = path.stat().st_size
+            if kept < self.max_entries and total + size <= self.max_bytes:
+                kept, total = kept + 1, total + size
+            else:
+                path.unlink(missing_ok=True)
+
+
+def results_dir():
+    """Directory for on-disk result caches, or None when disabled."""
+    return CACHE_DIR / 'results' if DISK_RESULTS else None
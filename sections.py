@@ -0,0 +1,83 @@
+import sys
+import importlib
+from instrumentation import step
+
+TAB_TITLES = ['Overview', 'Country & Continent', 'Animated World Map', 'Diversity',
+              'Research & Industry', 'Pairwise Analysis', 'K-Means Clusters', 'Advanced Insights',
+              'University Comparer','Conclusions','View Data','EDA']
+
+# Module and render function of each section, in TAB_TITLES order. Section modules
+# (and the analytics libraries they pull in: umap, hdbscan, sklearn, seaborn, ...)
+# are imported the first time the section runs, not at startup.
+SECTION_MODULES = [
+    ('tabs.overview_tab', 'render_overview_tab'),
+    ('tabs.geo_tab', 'render_geo_tab'),
+    ('tabs.map_tab', 'render_map_tab'),
+    ('tabs.diversity_tab', 'render_diversity_tab'),
+    ('tabs.research_tab', 'render_research_tab'),
+    ('tabs.pairwise_tab', 'render_pairwise_tab'),
+    ('tabs.cluster_tab', 'render_cluster_tab'),
+    ('tabs.advanced_insights_tab', 'render_advanced_insights_tab'),
+    ('tabs.comparer_tab', 'render_comparer_tab'),
+    ('tabs.conclusions_tab', 'render_conclusions_tab'),
+    ('tabs.data_view_tab', 'render_data_view_tab'),
+    ('tabs.eda_tab', 'render_eda_tab'),
+]
+
+SELECTED_VARS = ['Overall Score', 'Teaching', 'Research Environment', 'Research Quality', 'Industry Impact']
+
+# Default of the sidebar's Overall Score slider
+SCORE_RANGE = (0.0, 100.0)
+
+
+def filtered_view(engine, year=None, countries=(), rank_range=None, score_range=SCORE_RANGE):
+    """
+    The frame the sidebar filters select. Without `rank_range` the full rank range of
+    the year/country selection is used, as the Rank slider does by default.
+    """
+    if rank_range is None:
+        rank_range = engine.rank_bounds(engine.rows(year=year, countries=countries))
+    return engine.view(year=year, countries=countries, rank_range=rank_range, score_range=score_range)
+
+
+def load_section(title):
+    """
+    Imports the module of a section on first use and returns its render function.
+
+    Args:
+        title (str): A TAB_TITLES entry.
+    """
+    module_name, func_name = SECTION_MODULES[TAB_TITLES.index(title)]
+    module = sys.modules.get(module_name)
+    if module is None:
+        with step(f'import {module_name}'):  # Shows the import cost in the Diagnostics panel
+            module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+
+def section_renderers(df, DF, cube, engine, selected_vars=SELECTED_VARS):
+    """
+    Zero-argument callables rendering each dashboard section, in TAB_TITLES order.
+    A section's module is imported when its callable first runs.
+
+    Args:
+        df (pd.DataFrame): The filtered DataFrame based on sidebar selections.
+        DF (pd.DataFrame): The original, unfiltered DataFrame.
+        cube (StatsCube): Pre-aggregated Year x Country statistics of DF.
+        engine (FilterEngine): Row index over DF.
+        selected_vars (list): Core metric column names.
+    """
+    return [
+        lambda: load_section('Overview')(df, DF),
+        lambda: load_section('Country & Continent')(DF, cube),
+        lambda: load_section('Animated World Map')(cube),
+        lambda: load_section('Diversity')(df, cube),
+        lambda: load_section('Research & Industry')(df, cube, selected_vars),
+        lambda: load_section('Pairwise Analysis')(df, selected_vars),
+        lambda: load_section('K-Means Clusters')(df, selected_vars),
+        lambda: load_section('Advanced Insights')(df, DF, selected_vars),
+        lambda: load_section('University Comparer')(DF, selected_vars),
+        lambda: load_section('Conclusions')(),
+        lambda: load_section('View Data')(engine),
+        lambda: load_section('EDA')(DF, cube),
+    ]
@@ -0,0 +1,96 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from data_processing import load_data
+from instrumentation import instrumented_cache
+
+
+class SimilarityIndex:
+    """
+    Cosine-similarity lookups ("academic twins") over the full dataset for one metric set.
+
+    The metrics are standardized over every row with complete values and each row is
+    L2-normalized once, so the cosine similarity of one university against all the
+    universities of a country is a single matrix-vector product. A university is
+    represented by its most recent row.
+    """
+
+    def __init__(self, df, metrics):
+        self.metrics = list(metrics)
+        data = df.dropna(subset=self.metrics)
+        X = StandardScaler().fit_transform(data[self.metrics].astype(float))
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        self.X = np.divide(X, norms, out=np.zeros_like(X), where=norms > 0)
+
+        self._names = data['Name'].astype(str).to_numpy()
+        self._countries = data['Country'].astype(str).to_numpy()
+        self._scores = data['Overall Score'].to_numpy(dtype=float)
+        positions = pd.Series(np.arange(len(data)))
+        self._last_row = dict(zip(self._names, np.arange(len(data))))  # later rows win
+        self._by_country = {c: idx.to_numpy() for c, idx in positions.groupby(self._countries)}
+        self._country_members = {}
+
+    def __contains__(self, name):
+        return name in self._last_row
+
+    def info(self, name):
+        """(country, overall score) of the row representing `name`."""
+        pos = self._last_row[name]
+        return self._countries[pos], self._scores[pos]
+
+    def _members(self, country):
+        """
+        Universities with rows in `country`, in order of first appearance, with the
+        position of their representative row and their latest score in that country.
+        """
+        if country not in self._country_members:
+            rows = self._by_country.get(country, np.array([], dtype=int))
+            names = pd.Series(self._names[rows])
+            first = ~names.duplicated(keep='first').to_numpy()
+            last_score = pd.Series(self._scores[rows]).groupby(names.to_numpy()).last()
+            member_names = names[first].to_numpy()
+            self._country_members[country] = (
+                member_names,
+                np.array([self._last_row[n] for n in member_names], dtype=int),
+                last_score.reindex(member_names).to_numpy(),
+            )
+        return self._country_members[country]
+
+    def twins(self, name, country, threshold=None, k=None):
+        """
+        Universities in `country` most similar to `name`.
+
+        Args:
+            name (str): The source university.
+            country (str): The country to search.
+            threshold (float): Keep universities with similarity >= threshold (in %).
+            k (int): Keep the k most similar universities instead; no threshold needed.
+
+        Returns:
+            pd.DataFrame: Name, Country, Overall Score and Similarity (%) per twin, in
+            order of appearance for threshold queries and by similarity for top-k queries.
+        """
+        names, rows, scores = self._members(country)
+        keep = names != name
+        names, rows, scores = names[keep], rows[keep], scores[keep]
+        sims = self.X[rows] @ self.X[self._last_row[name]] * 100
+
+        if k is not None:
+            k = min(k, len(sims))
+            top = np.argpartition(-sims, k - 1)[:k] if k else np.array([], dtype=int)
+            order = top[np.argsort(-sims[top], kind='stable')]
+        else:
+            order = np.flatnonzero(sims >= threshold)
+        return pd.DataFrame({
+            'Name': names[order],
+            'Country': country,
+            'Overall Score': scores[order],
+            'Similarity': sims[order],
+        })
+
+
+@instrumented_cache(st.cache_resource)
+def get_similarity_index(metrics):
+    """Builds (once per process and metric set) the similarity index over the loaded dataset."""
+    return SimilarityIndex(load_data(), list(metrics))
@@ -0,0 +1,175 @@
+import hashlib
+import streamlit as st
+import pandas as pd
+import numpy as np
+from data_processing import load_data
+from instrumentation import instrumented_cache
+
+CUBE_METRICS = ['Overall Score', 'Teaching', 'Research Environment', 'Research Quality',
+                'Industry Impact', 'International Outlook', 'Student Population',
+                'Students to Staff Ratio', 'International Students', 'Female %', 'Male %']
+NO_ROW = np.iinfo(np.int64).max  # First-row position of an empty cell
+
+
+class StatsCube:
+    """
+    Pre-aggregated (Year x Country) statistics over the master dataset.
+
+    For every metric the cube stores the non-missing count, the sum and the sum of
+    squares per (Year, Country) cell, plus the number of rows per cell, all as
+    cumulative sums along Year. A year-range query is one subtraction of two year
+    slices; country rows roll up to continents with a bincount. Means skip missing
+    values, matching pandas groupby means. Each cell also keeps the position of its
+    first row, so counts can be ordered like value_counts().
+    """
+
+    def __init__(self, df, metrics=CUBE_METRICS):
+        self.metrics = list(metrics)
+        self._metric_idx = {m: i for i, m in enumerate(self.metrics)}
+
+        year_codes, years = pd.factorize(df['Year'], sort=True)
+        country_codes, countries = pd.factorize(df['Country'], sort=True)
+        self.years = np.asarray(years, dtype=int)
+        self.countries = pd.Index([str(c) for c in countries], name='Country')
+        n_years, n_countries = len(self.years), len(self.countries)
+
+        # Each country belongs to a single continent
+        continent = df.groupby(country_codes)['Continent'].first().astype(str)
+        self.continent_of = pd.Series(continent.to_numpy(), index=self.countries, name='Continent')
+        self._continent_codes, self.continents = pd.factorize(self.continent_of, sort=True)
+
+        cell = year_codes * n_countries + country_codes
+        size = n_years * n_countries
+        shape = (n_years, n_countries)
+        rows = np.bincount(cell, minlength=size).reshape(shape)
+        first = np.full(size, NO_ROW)
+        np.minimum.at(first, cell, np.arange(len(df)))
+
+        count = np.zeros(shape + (len(self.metrics),))
+        total = np.zeros_like(count)
+        total_sq = np.zeros_like(count)
+        for i, metric in enumerate(self.metrics):
+            values = df[metric].to_numpy(dtype=float, na_value=np.nan)
+            ok = ~np.isnan(values)
+            count[..., i] = np.bincount(cell[ok], minlength=size).reshape(shape)
+            total[..., i] = np.bincount(cell[ok], weights=values[ok], minlength=size).reshape(shape)
+            total_sq[..., i] = np.bincount(cell[ok], weights=values[ok] ** 2, minlength=size).reshape(shape)
+
+        def cumulative(a):
+            return np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+
+        self._rows = rows
+        self._first = first.reshape(shape)
+        self._count, self._sum, self._sum_sq = count, total, total_sq
+        self._cum_rows = cumulative(rows)
+        self._cum_count, self._cum_sum, self._cum_sum_sq = cumulative(count), cumulative(total), cumulative(total_sq)
+
+        # Content hash, for cache keys of results derived from the cube
+        h = hashlib.sha1(repr((self.metrics, list(self.countries), list(self.continent_of))).encode())
+        for a in (self.years, rows, count, total, total_sq):
+            h.update(np.ascontiguousarray(a).tobytes())
+        self.fingerprint = h.hexdigest()[:16]
+
+    def _year_slice(self, years):
+        """Cube indices [lo, hi) covering the inclusive year range `years` (None = all)."""
+        if years is None:
+            return 0, len(self.years)
+        lo = np.searchsorted(self.years, years[0], side='left')
+        hi = np.searchsorted(self.years, years[1], side='right')
+        return lo, hi
+
+    def _cols(self, metrics):
+        return [self._metric_idx[m] for m in metrics]
+
+    def _range_totals(self, years, metrics):
+        """Per-country (rows, count, sum, sum_sq) over a year range."""
+        lo, hi = self._year_slice(years)
+        cols = self._cols(metrics)
+        rows = self._cum_rows[hi] - self._cum_rows[lo]
+        count = self._cum_count[hi][:, cols] - self._cum_count[lo][:, cols]
+        total = self._cum_sum[hi][:, cols] - self._cum_sum[lo][:, cols]
+        total_sq = self._cum_sum_sq[hi][:, cols] - self._cum_sum_sq[lo][:, cols]
+        return rows, count, total, total_sq
+
+    @staticmethod
+    def _mean(count, total):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, total / np.where(count > 0, count, 1), np.nan)
+
+    def rows_by_country(self, years=None):
+        """
+        Number of rows per country in the year range, omitting countries without rows,
+        ordered like value_counts() on the range's rows: by count, ties in order of
+        first appearance.
+        """
+        rows, *_ = self._range_totals(years, [])
+        lo, hi = self._year_slice(years)
+        first_row = self._first[lo:hi].min(axis=0, initial=NO_ROW)
+        counts = pd.Series(rows.astype(int), index=self.countries).iloc[np.argsort(first_row, kind='stable')]
+        return counts[counts > 0].sort_values(ascending=False)  # The sort value_counts() applies
+
+    def country_mean(self, metrics, years=None):
+        """Mean of each metric per country over the year range (index: Country)."""
+        rows, count, total, _ = self._range_totals(years, metrics)
+        means = pd.DataFrame(self._mean(count, total), index=self.countries, columns=metrics)
+        return means[rows > 0]
+
+    def country_std(self, metrics, years=None):
+        """Sample standard deviation of each metric per country over the year range."""
+        rows, count, total, total_sq = self._range_totals(years, metrics)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (total_sq - total ** 2 / count) / (count - 1)
+        std = np.sqrt(np.clip(np.where(count > 1, var, np.nan), 0, None))
+        return pd.DataFrame(std, index=self.countries, columns=metrics)[rows > 0]
+
+    def continent_mean(self, metrics, years=None):
+        """Mean of each metric per continent over the year range (index: Continent)."""
+        rows, count, total, _ = self._range_totals(years, metrics)
+        k = len(self.continents)
+        c_rows = np.bincount(self._continent_codes, weights=rows, minlength=k)
+        c_count = np.stack([np.bincount(self._continent_codes, weights=count[:, j], minlength=k)
+                            for j in range(len(metrics))], axis=1).reshape(k, len(metrics))
+        c_total = np.stack([np.bincount(self._continent_codes, weights=total[:, j], minlength=k)
+                            for j in range(len(metrics))], axis=1).reshape(k, len(metrics))
+        index = pd.Index(self.continents, name='Continent')
+        means = pd.DataFrame(self._mean(c_count, c_total), index=index, columns=metrics)
+        return means[c_rows > 0]
+
+    def year_mean(self, metrics):
+        """Mean of each metric per year across all countries (index: Year)."""
+        cols = self._cols(metrics)
+        count = self._count[..., cols].sum(axis=1)
+        total = self._sum[..., cols].sum(axis=1)
+        index = pd.Index(self.years, name='Year')
+        return pd.DataFrame(self._mean(count, total), index=index, columns=metrics)
+
+    def _cells(self, countries):
+        """Boolean (Year, Country) mask of non-empty cells, optionally limited to `countries`."""
+        cells = self._rows > 0
+        if countries is not None:
+            cells = cells & self.countries.isin(countries)[np.newaxis, :]
+        return cells
+
+    def year_country_mean(self, metrics, countries=None):
+        """Long frame of Year, Country and per-cell metric means, sorted by Year then Country."""
+        cells = self._cells(countries)
+        y, c = np.nonzero(cells)
+        cols = self._cols(metrics)
+        means = self._mean(self._count[y, c][:, cols], self._sum[y, c][:, cols])
+        out = pd.DataFrame(means, columns=metrics)
+        out.insert(0, 'Country', self.countries[c])
+        out.insert(0, 'Year', self.years[y])
+        return out
+
+    def year_country_rows(self, countries=None):
+        """Long frame of Year, Country and the number of rows (universities) per cell."""
+        cells = self._cells(countries)
+        y, c = np.nonzero(cells)
+        return pd.DataFrame({'Year': self.years[y], 'Country': self.countries[c],
+                             'Universities': self._rows[y, c].astype(int)})
+
+
+@instrumented_cache(st.cache_resource)
+def get_stats_cube():
+    """Builds the statistics cube once per process over the loaded dataset."""
+    return StatsCube(load_data())
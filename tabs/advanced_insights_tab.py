@@ -1,12 +1,48 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import umap
-import hdbscan
 import networkx as nx
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
+from similarity import get_similarity_index
+from name_index import get_name_index
+from knn_graph import start_knn_graph, ALL_SCOPE
+from result_cache import ResultCache, frame_fingerprint, make_key, results_dir
+from instrumentation import instrumented_cache, step
+from warmup import WARMUP, NUMBA_CACHE_DIR
+
+UMAP_PARAMS = dict(random_state=42, n_neighbors=15, min_dist=0.1)
+HDBSCAN_PARAMS = dict(min_cluster_size=10, prediction_data=True)
+
+
+@instrumented_cache(st.cache_resource)
+def embedding_cache():
+    """Process-wide LRU cache of UMAP embeddings and HDBSCAN labels."""
+    return ResultCache('umap_hdbscan', max_entries=16, max_bytes=64 * 2**20, disk_dir=results_dir())
+
+
+def umap_hdbscan(data, metrics):
+    """
+    Returns (embedding, labels) for the given rows and metrics, reusing a cached
+    result when the same row set, metric values and parameters were seen before.
+    """
+    cache = embedding_cache()
+    key = make_key(frame_fingerprint(data, metrics), tuple(metrics), UMAP_PARAMS, HDBSCAN_PARAMS)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached['embedding'], cached['labels']
+
+    import umap  # numba-compiled; cached embeddings are served without importing it
+    import hdbscan
+
+    with step('fit UMAP + HDBSCAN'):
+        X_scaled = StandardScaler().fit_transform(data[metrics].astype(float))
+        embedding = umap.UMAP(**UMAP_PARAMS).fit_transform(X_scaled)
+        labels = hdbscan.HDBSCAN(**HDBSCAN_PARAMS).fit_predict(embedding)
+    cache.put(key, {'embedding': embedding, 'labels': labels})
+    return embedding, labels
+
 
 def render_advanced_insights_tab(df, DF, selected_vars):
     """
@@ -21,6 +57,14 @@ def render_advanced_insights_tab(df, DF, selected_vars):
 
     # --- UMAP + HDBSCAN Clustering ---
     st.subheader('🔹 UMAP + HDBSCAN Clustering')
+    if WARMUP.state == 'running':
+        st.info(f'⏳ UMAP/HDBSCAN kernels are compiling in the background (started '
+                f'{time.time() - WARMUP.started:.0f}s ago); the first clustering may wait for them.')
+    elif WARMUP.state == 'done':
+        st.caption(f'UMAP/HDBSCAN kernels warmed up in {WARMUP.elapsed:.1f}s at startup '
+                   f'(numba cache: {NUMBA_CACHE_DIR}).')
+    elif WARMUP.state == 'failed':
+        st.caption(f'UMAP/HDBSCAN warm-up failed ({WARMUP.error}); kernels compile on the first clustering.')
     
     umap_metrics = st.multiselect(
         'Select Metrics for UMAP & HDBSCAN Clustering',
@@ -34,13 +78,7 @@ def render_advanced_insights_tab(df, DF, selected_vars):
         if data_umap.shape[0] < 15: # UMAP default n_neighbors is 15
             st.warning(f"Not enough data ({data_umap.shape[0]} universities) for robust UMAP/HDBSCAN. Please broaden filters.")
         else:
-            X_umap_scaled = StandardScaler().fit_transform(data_umap[umap_metrics])
-
-            reducer = umap.UMAP(random_state=42, n_neighbors=15, min_dist=0.1)
-            X_embedded = reducer.fit_transform(X_umap_scaled)
-
-            clusterer = hdbscan.HDBSCAN(min_cluster_size=10, prediction_data=True)
-            labels = clusterer.fit_predict(X_embedded)
+            X_embedded, labels = umap_hdbscan(data_umap, umap_metrics)
 
             data_umap['UMAP1'] = X_embedded[:, 0]
             data_umap['UMAP2'] = X_embedded[:, 1]
@@ -62,47 +100,48 @@ def render_advanced_insights_tab(df, DF, selected_vars):
     st.markdown("Find universities in one country that are most similar to a selected university from another, based on their performance metrics.")
 
     if umap_metrics and not data_umap.empty:
+        names = get_name_index()
         col1, col2 = st.columns(2)
         with col1:
-            # Use the full, unfiltered dataframe for the source university list
-            uni_list = sorted(DF['Name'].unique())
+            # Use the full, unfiltered name list; a search narrows it to the best matches
+            uni_query = st.text_input('Find a university (typos and accents are fine):', key='twin_search')
+            uni_list = names.search(uni_query, limit=50) if uni_query else names.names
+            if not uni_list:
+                st.caption('No close matches; showing all universities.')
+                uni_list = names.names
             selected_uni = st.selectbox('Select a University:', uni_list, key='selected_uni_real')
         with col2:
-            country_list = sorted(DF['Country'].unique())
+            country_list = names.countries
             selected_country = st.selectbox('Select a Country to Compare Against:', country_list, index=country_list.index("United States"), key='selected_country_real')
 
-        sim_threshold = st.slider(
-            'Similarity Threshold (%)', min_value=70, max_value=99, value=90,
-            help="Higher threshold means stronger similarity required to draw a link."
+        link_mode = st.radio(
+            'Link universities by', ['Similarity threshold', 'Top-k most similar'],
+            horizontal=True, key='twin_link_mode'
         )
-        
-        # Prepare data for similarity calculation from the full dataset
-        data_real = DF.dropna(subset=umap_metrics).copy()
-        X_real = StandardScaler().fit_transform(data_real[umap_metrics])
-        
-        # Create a mapping from name to index for quick lookup
-        name_to_idx = {name: i for i, name in enumerate(data_real['Name'])}
-
-        if selected_uni not in name_to_idx:
+        if link_mode == 'Similarity threshold':
+            sim_threshold = st.slider(
+                'Similarity Threshold (%)', min_value=70, max_value=99, value=90,
+                help="Higher threshold means stronger similarity required to draw a link."
+            )
+            top_k = None
+        else:
+            top_k = st.slider('Number of twins (k)', min_value=1, max_value=30, value=10, key='twin_top_k')
+            sim_threshold = None
+
+        # Standardized, L2-normalized metrics over the full dataset, built once per metric set
+        sim_index = get_similarity_index(tuple(umap_metrics))
+
+        if selected_uni not in sim_index:
             st.warning(f"'{selected_uni}' not found in the dataset after filtering for metric calculations. It may have missing values in the selected metrics.")
         else:
             G = nx.Graph()
-            idx_main = name_to_idx[selected_uni]
-            main_uni_data = data_real.iloc[idx_main]
-            
-            G.add_node(selected_uni, country=main_uni_data['Country'], score=main_uni_data['Overall Score'])
-
-            # Filter for universities in the target country
-            target_country_df = data_real[data_real['Country'] == selected_country]
-            
-            for idx, row in target_country_df.iterrows():
-                univ = row['Name']
-                if univ != selected_uni:
-                    idx_target = name_to_idx[univ]
-                    sim = cosine_similarity(X_real[idx_main].reshape(1, -1), X_real[idx_target].reshape(1, -1))[0][0] * 100
-                    if sim >= sim_threshold:
-                        G.add_node(univ, country=row['Country'], score=row['Overall Score'])
-                        G.add_edge(selected_uni, univ, weight=sim)
+            main_country, main_score = sim_index.info(selected_uni)
+            G.add_node(selected_uni, country=main_country, score=main_score)
+
+            twins = sim_index.twins(selected_uni, selected_country, threshold=sim_threshold, k=top_k)
+            for univ, country, score, sim in twins.itertuples(index=False):
+                G.add_node(univ, country=country, score=score)
+                G.add_edge(selected_uni, univ, weight=sim)
 
             if len(G.nodes()) > 1:
                 pos = nx.spring_layout(G, seed=42)
@@ -139,6 +178,48 @@ def render_advanced_insights_tab(df, DF, selected_vars):
                                        )
                 st.plotly_chart(fig_network, use_container_width=True)
             else:
-                st.info(f"No universities in {selected_country} met the {sim_threshold}% similarity threshold with {selected_uni}.")
+                if top_k is None:
+                    st.info(f"No universities in {selected_country} met the {sim_threshold}% similarity threshold with {selected_uni}.")
+                else:
+                    st.info(f"No other universities in {selected_country} have complete values for the selected metrics.")
+
+        # --- Closest Peers from the precomputed k-NN graph ---
+        st.markdown("---")
+        st.subheader('🔹 Closest Peers Anywhere')
+        st.markdown(f"Nearest universities to {selected_uni} across every country and year, from a precomputed nearest-neighbour graph (ignores sidebar filters).")
+
+        build = start_knn_graph(umap_metrics)
+        knn = build.graph
+        peer_years = knn.years_of(selected_uni) if knn is not None else []
+        if build.state == 'running':
+            st.info(f'⏳ The nearest-peer graph for these metrics is being built in the background (started '
+                    f'{time.time() - build.started:.0f}s ago); the peers appear on a later rerun. '
+                    f'`python knn_graph.py` precomputes it.')
+        elif build.state == 'failed':
+            st.warning(f'The nearest-peer graph could not be built ({build.error}); it is retried on the next rerun.')
+        elif not peer_years:
+            st.info(f"'{selected_uni}' has missing values in the selected metrics for every year.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                peer_year = st.selectbox('Year of the selected university', peer_years[::-1], key='peer_year')
+            with c2:
+                continents = [scope for scope in knn.graphs if scope != ALL_SCOPE]
+                peer_scope = st.selectbox('Peers from', [ALL_SCOPE] + continents, key='peer_scope')
+            with c3:
+                only_mutual = st.checkbox('Only mutual twins', key='peer_mutual',
+                                          help='Keep peers that also count this university among their own closest peers.')
+
+            if only_mutual:
+                peers = knn.mutual_twins(selected_uni, peer_year)
+                if peer_scope != ALL_SCOPE:
+                    peers = peers[peers['Continent'] == peer_scope]
+            else:
+                peers = knn.peers(selected_uni, peer_year, scope=peer_scope)
+
+            if peers.empty:
+                st.info('No peers found for this selection.')
+            else:
+                st.dataframe(peers.style.format({'Similarity': '{:.2f}%'}), use_container_width=True, hide_index=True)
     else:
         st.warning('Please select metrics to build the similarity network.')
\ No newline at end of file
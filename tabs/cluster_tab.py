@@ -1,9 +1,86 @@
+import os
+import threading
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from concurrent.futures import ThreadPoolExecutor
+from threadpoolctl import threadpool_limits
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from result_cache import ResultCache, frame_fingerprint, make_key, results_dir
+from instrumentation import instrumented_cache, step
+
+# Selections larger than this default to MiniBatchKMeans
+MINIBATCH_ROWS = int(os.environ.get('WUR_MINIBATCH_ROWS', 50000))
+
+# threadpool_limits changes the OpenMP thread count of the whole process, so sweeps
+# from concurrent sessions run one at a time (each already uses every core), and an
+# overlapping sweep cannot restore a stale limit when it finishes
+_sweep_lock = threading.Lock()
+
+
+@instrumented_cache(st.cache_resource)
+def kmeans_cache():
+    """Process-wide LRU cache of k sweeps (fitted models, inertias), their PCA projections and extra models."""
+    return ResultCache('kmeans_sweep', max_entries=16, max_bytes=64 * 2**20, disk_dir=results_dir())
+
+
+def _fit_kmeans(X, k, minibatch):
+    model = MiniBatchKMeans if minibatch else KMeans
+    return model(n_clusters=k, random_state=0, n_init='auto').fit(X)
+
+
+def kmeans_sweep(data, cols, minibatch=False):
+    """
+    Fits k = 2..10 (bounded by the sample size) on a worker pool and returns the cached
+    sweep for this row set and metric selection: the scaled matrix, the fitted models
+    by k and their inertias. A cached sweep is reused by every later rerun and never
+    modified after it is cached; its PCA projection and models for other k are cached
+    under their own keys (see pca_projection and fitted_model).
+    """
+    cache = kmeans_cache()
+    key = make_key('sweep', frame_fingerprint(data, cols), tuple(cols), minibatch)
+    sweep = cache.get(key)
+    if sweep is not None:
+        return sweep
+
+    X = StandardScaler().fit_transform(data[cols].astype(float))
+    k_range = list(range(2, min(11, data.shape[0])))  # Ensure k is not larger than sample size
+    models = {}
+    if k_range:
+        workers = min(len(k_range), os.cpu_count() or 1)
+        # Split the cores between the parallel fits instead of oversubscribing OpenMP
+        # (k-means runs on OpenMP; scikit-learn already keeps its BLAS calls single-threaded)
+        with step('fit k-means sweep'), _sweep_lock, \
+                threadpool_limits(limits=max(1, (os.cpu_count() or 1) // workers), user_api='openmp'):
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                models = dict(zip(k_range, pool.map(lambda k: _fit_kmeans(X, k, minibatch), k_range)))
+    sweep = {'key': key, 'X': X, 'models': models, 'k_range': k_range,
+             'inertias': [models[k].inertia_ for k in k_range], 'minibatch': minibatch}
+    return cache.put(key, sweep)
+
+
+def fitted_model(sweep, k):
+    """The model for k from the sweep, or a separately cached fit if k was outside the sweep."""
+    if k in sweep['models']:
+        return sweep['models'][k]
+    cache = kmeans_cache()
+    key = make_key(sweep['key'], 'model', k)
+    model = cache.get(key)
+    if model is None:
+        model = cache.put(key, _fit_kmeans(sweep['X'], k, sweep['minibatch']))
+    return model
+
+
+def pca_projection(sweep):
+    """3-component PCA projection of the sweep's scaled matrix, cached next to the sweep."""
+    cache = kmeans_cache()
+    key = make_key(sweep['key'], 'pca')
+    X_pca = cache.get(key)
+    if X_pca is None:
+        X_pca = cache.put(key, PCA(n_components=3).fit_transform(sweep['X']))
+    return X_pca
 
 def render_cluster_tab(df, selected_vars):
     """
@@ -31,17 +108,15 @@ def render_cluster_tab(df, selected_vars):
         st.warning("Not enough data to perform clustering with the current filters. Please select more data.")
         return
         
-    X = StandardScaler().fit_transform(data_c[cols])
+    minibatch = st.checkbox(
+        'Use MiniBatchKMeans (faster on large selections)',
+        value=data_c.shape[0] > MINIBATCH_ROWS, key='cluster_minibatch'
+    )
+    sweep = kmeans_sweep(data_c, cols, minibatch)
 
     # --- Elbow Method ---
-    inertias = []
-    k_range = range(2, min(11, data_c.shape[0])) # Ensure k is not larger than sample size
+    k_range, inertias = sweep['k_range'], sweep['inertias']
     if len(k_range) > 0:
-        for i in k_range:
-            km = KMeans(n_clusters=i, random_state=0, n_init='auto')
-            km.fit(X)
-            inertias.append(km.inertia_)
-
         fig_elbow = px.line(
             x=list(k_range), y=inertias, markers=True,
             title='Elbow Method: Inertia vs. Number of Clusters (k)'
@@ -59,7 +134,7 @@ def render_cluster_tab(df, selected_vars):
         st.error(f"❗ Not enough universities ({data_c.shape[0]}) to create {k} clusters. Please lower k or adjust filters.")
     else:
         st.write(f"🔹 **Running K-Means with k = {k}**")
-        kmeans = KMeans(n_clusters=k, random_state=0, n_init='auto').fit(X)
+        kmeans = fitted_model(sweep, k)
         data_c = data_c.copy()
         data_c['Cluster'] = kmeans.labels_.astype(str)
 
@@ -73,8 +148,7 @@ def render_cluster_tab(df, selected_vars):
         st.plotly_chart(fig_counts, use_container_width=True)
 
         # --- PCA Visualization ---
-        pca = PCA(n_components=3)
-        X_pca = pca.fit_transform(X)
+        X_pca = pca_projection(sweep)
         data_c['PC1'] = X_pca[:, 0]
         data_c['PC2'] = X_pca[:, 1]
         data_c['PC3'] = X_pca[:, 2]
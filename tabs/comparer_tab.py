@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from name_index import get_name_index
 
 def render_comparer_tab(DF, selected_vars):
     """
@@ -14,7 +15,7 @@ def render_comparer_tab(DF, selected_vars):
     st.subheader('University Comparer')
     st.markdown('Select two universities to compare them across different metrics.')
 
-    universities = sorted(DF['Name'].unique())
+    universities = get_name_index().names
     # Default to two well-known universities for a good initial example
     default_unis = []
     if "University of Oxford" in universities and "Harvard University" in universities:
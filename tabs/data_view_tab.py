@@ -1,37 +1,57 @@
 import streamlit as st
-import pandas as pd
 
-def render_data_view_tab(DF):
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+def render_data_view_tab(engine):
     """
     Renders the Data Explorer tab.
 
+    Only the current page is sent to the browser. Filtering, sorting and the total
+    row count come from the filter engine's cached row positions, so turning pages
+    or re-sorting does not rescan or copy the dataset.
+
     Args:
-        DF (pd.DataFrame): The original, unfiltered DataFrame.
+        engine (FilterEngine): Row index over the original, unfiltered DataFrame.
     """
+    DF = engine.df
     st.subheader("Dataset Explorer")
 
     # --- Filters for the data view ---
-    query = st.text_input("🔍 Search University Name (substring match)", key="data_view_search")
+    query = st.text_input("🔍 Search University Name (substring match, ignores case and accents)", key="data_view_search")
 
-    years = sorted(DF['Year'].unique())
+    years = engine.years
     sel_years = st.multiselect("Filter Years", years, default=years, key="data_view_years")
-    
-    countries = sorted(DF['Country'].unique())
+
+    countries = engine.countries()
     sel_countries = st.multiselect("Filter Countries", countries, default=countries, key="data_view_countries")
 
     all_cols = DF.columns.tolist()
     sel_cols = st.multiselect("Select Columns to Display", all_cols, default=all_cols, key="data_view_cols")
 
-    # --- Apply filters ---
-    df_view = DF[
-        (DF['Year'].isin(sel_years)) &
-        (DF['Country'].isin(sel_countries))
-    ]
-    if query:
-        df_view = df_view[df_view['Name'].str.contains(query, case=False, na=False)]
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        sort_by = st.selectbox("Sort by", ['(dataset order)'] + all_cols, key="data_view_sort")
+    with c2:
+        descending = st.radio("Order", ['Ascending', 'Descending'], horizontal=True, key="data_view_order") == 'Descending'
+    with c3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=2, key="data_view_page_size")
+
+    # --- Apply filters (cached row positions; nothing is copied yet) ---
+    rows = engine.search(
+        sel_years, sel_countries, query,
+        sort_by=None if sort_by == '(dataset order)' else sort_by,
+        ascending=not descending,
+    )
+    total = len(rows)
+    n_pages = max(1, -(-total // page_size))
 
-    # --- Display DataFrame ---
+    # --- Display the current page ---
     if not sel_cols:
         st.warning("Please select at least one column to display.")
     else:
-        st.dataframe(df_view[sel_cols], use_container_width=True)
\ No newline at end of file
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1, key="data_view_page")
+        page = min(page, n_pages)
+        start = (page - 1) * page_size
+        stop = min(start + page_size, total)
+        st.caption(f"Showing rows {start + 1 if total else 0:,}–{stop:,} of {total:,}")
+        st.dataframe(DF.take(rows[start:stop])[sel_cols], use_container_width=True)
@@ -1,16 +1,17 @@
 import streamlit as st
 import plotly.express as px
+from trendlines import TRENDLINE_METHODS, add_trendline
 
-def render_diversity_tab(df, DF):
+def render_diversity_tab(df, cube):
     """
     Renders the Diversity tab, showing gender and international student data.
 
     Args:
         df (pd.DataFrame): The filtered DataFrame based on sidebar selections.
-        DF (pd.DataFrame): The original, unfiltered DataFrame.
+        cube (StatsCube): Pre-aggregated Year x Country statistics of the unfiltered data.
     """
     st.subheader('Mean Gender Diversity Over Time Worldwide')
-    dfem = DF.groupby('Year')[['Female %', 'Male %']].mean().reset_index()
+    dfem = cube.year_mean(['Female %', 'Male %']).reset_index()
     fig4 = px.line(dfem, x='Year', y=['Female %', 'Male %'], title='Global Gender Balance Trend (2016-2025)')
     fig4.update_yaxes(range=[45, 55]) # Adjusted range for better visibility
     st.plotly_chart(fig4, use_container_width=True)
@@ -23,19 +24,13 @@ def render_diversity_tab(df, DF):
     with col1:
         # Top 10 countries by historical Female %
         top10_gender = (
-            DF.groupby('Country')['Female %']
-            .mean()
+            cube.country_mean(['Female %'])['Female %']
             .nlargest(10)
             .index
             .tolist()
         )
         # Evolution of Female % in those top 10
-        dfem_top10 = (
-            DF[DF['Country'].isin(top10_gender)]
-            .groupby(['Year','Country'])['Female %']
-            .mean()
-            .reset_index()
-        )
+        dfem_top10 = cube.year_country_mean(['Female %'], countries=top10_gender)
         fig_top10_gender = px.line(
             dfem_top10, x='Year', y='Female %', color='Country',
             markers=True, title='Top 10 Countries by Average Female %: Yearly Trend'
@@ -44,8 +39,8 @@ def render_diversity_tab(df, DF):
 
     with col2:
         # Top 10 Countries Hosting International Students
-        top_ci = DF.groupby('Country')['International Students'].mean().nlargest(10).index
-        grouped_ci = DF[DF['Country'].isin(top_ci)].groupby(['Country', 'Year'])['International Students'].mean().reset_index()
+        top_ci = cube.country_mean(['International Students'])['International Students'].nlargest(10).index
+        grouped_ci = cube.year_country_mean(['International Students'], countries=top_ci).sort_values(['Country', 'Year'])
         fig_topci = px.line(
             grouped_ci, x='Year', y='International Students', color='Country',
             markers=True, title='Top 10 Countries by Avg. International Students %'
@@ -55,13 +50,14 @@ def render_diversity_tab(df, DF):
     st.markdown('---')
     
     st.subheader('Metrics vs. Scores (respects sidebar filters)')
+    trend = st.radio('Trendline', TRENDLINE_METHODS, horizontal=True, key='diversity_trendline')
 
     c1, c2 = st.columns(2)
     with c1:
         # Students to Staff Ratio vs Teaching Score
         st.write('Students to Staff Ratio vs Teaching Score')
-        fig5 = px.scatter(df, x='Students to Staff Ratio', y='Teaching', trendline='ols',
-                          hover_name='Name')
+        fig5 = px.scatter(df, x='Students to Staff Ratio', y='Teaching', hover_name='Name')
+        add_trendline(fig5, df, 'Students to Staff Ratio', 'Teaching', trend)
         st.plotly_chart(fig5, use_container_width=True)
         
     with c2:
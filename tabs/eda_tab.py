@@ -1,17 +1,98 @@
+import io
 import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import plotly.express as px
+import numpy as np
+from scipy.stats import gaussian_kde
+from data_processing import data_version
+from instrumentation import instrumented_cache
 
-def render_eda_tab(DF):
+DISTRIBUTION_COLS = {
+    'Overall Score': 'Overall Score Distribution',
+    'International Students': 'International Students % Distribution',
+    'Student Population': 'Student Population Distribution',
+    'Students to Staff Ratio': 'Students to Staff Ratio Distribution',
+}
+
+
+def histogram_kde(values, bins=30, grid_size=200):
+    """
+    Histogram counts and a KDE curve scaled to counts (as drawn by sns.histplot with
+    kde=True: Scott bandwidth, evaluated over the data range).
+    """
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    grid = np.linspace(values.min(), values.max(), grid_size)
+    density = gaussian_kde(values)(grid) if np.ptp(values) > 0 else np.zeros_like(grid)
+    return {'counts': counts, 'edges': edges, 'grid': grid,
+            'kde': density * values.size * (edges[1] - edges[0])}
+
+
+@instrumented_cache(st.cache_data(show_spinner=False))
+def eda_artifacts(_DF, version):
+    """
+    Widget-independent EDA results, computed once per dataset version.
+
+    Args:
+        _DF (pd.DataFrame): The original, unfiltered DataFrame (not hashed).
+        version (tuple): Dataset version key; see render_eda_tab.
+    """
+    missing = _DF.isna().sum()
+    missing_percent = (missing / len(_DF)) * 100
+    missing_df = pd.DataFrame({'Missing Count': missing, 'Missing Percentage': missing_percent})
+    missing_df = missing_df[missing_df['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
+
+    def score_row(pos):
+        row = _DF.iloc[pos]
+        return {'Name': row['Name'], 'Year': row['Year'], 'Overall Score': row['Overall Score']}
+
+    scores = _DF['Overall Score'].to_numpy(dtype=float, na_value=np.nan)
+    return {
+        'columns': list(_DF.columns),
+        'missing': missing_df,
+        'describe': _DF.describe(),
+        'unique_names': _DF['Name'].nunique(),
+        'max_row': score_row(np.nanargmax(scores)),
+        'min_row': score_row(np.nanargmin(scores)),
+        'distributions': {col: histogram_kde(_DF[col].to_numpy(dtype=float, na_value=np.nan))
+                          for col in DISTRIBUTION_COLS},
+    }
+
+
+@instrumented_cache(st.cache_data(show_spinner=False))
+def distribution_png(_dist, version, column, title):
+    """
+    Renders a cached histogram/KDE to PNG once per dataset version (with the
+    settings st.pyplot uses) and closes the figure, so reruns create no figures.
+    """
+    fig, ax = plt.subplots(figsize=(6, 4))
+    try:
+        edges = _dist['edges']
+        bars = pd.DataFrame({column: (edges[:-1] + edges[1:]) / 2, 'count': _dist['counts']})
+        sns.histplot(bars, x=column, weights='count', bins=len(_dist['counts']),
+                     binrange=(edges[0], edges[-1]), alpha=.5, ax=ax)
+        ax.plot(_dist['grid'], _dist['kde'], color=ax.patches[0].get_facecolor()[:3] if ax.patches else None)
+        ax.set_title(title)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def render_eda_tab(DF, cube):
     """
     Renders the Exploratory Data Analysis (EDA) tab.
 
     Args:
         DF (pd.DataFrame): The original, unfiltered DataFrame.
+        cube (StatsCube): Pre-aggregated Year x Country statistics of DF.
     """
     st.header("Exploratory Data Analysis")
+    version = (data_version(), len(DF), tuple(DF.dtypes.astype(str)))
+    eda = eda_artifacts(DF, version)
 
     st.subheader("Dataset Columns and Description of original data")
     columns_info = {
@@ -34,54 +115,32 @@ def render_eda_tab(DF):
     st.dataframe(description_df, use_container_width=True)
 
     st.subheader("Columns Present in Cleaned Data (DF)")
-    st.write(f"Total Columns: {len(DF.columns)}")
-    columns_list = ", ".join(DF.columns)
+    st.write(f"Total Columns: {len(eda['columns'])}")
+    columns_list = ", ".join(eda['columns'])
     st.write(f" {columns_list}")
 
     st.subheader("Missing Values Summary")
-    missing = DF.isna().sum()
-    missing_percent = (missing / len(DF)) * 100
-    missing_df = pd.DataFrame({'Missing Count': missing, 'Missing Percentage': missing_percent})
-    missing_df = missing_df[missing_df['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
-    st.dataframe(missing_df)
+    st.dataframe(eda['missing'])
 
     st.subheader("Descriptive Statistics")
-    st.dataframe(DF.describe(), use_container_width=True)
+    st.dataframe(eda['describe'], use_container_width=True)
 
     st.subheader("Key Data Points")
     c1, c2 = st.columns(2)
     with c1:
-        st.metric(label="Total Unique Universities", value=DF['Name'].nunique())
-        max_score_row = DF.loc[DF['Overall Score'].idxmax()]
+        st.metric(label="Total Unique Universities", value=eda['unique_names'])
+        max_score_row = eda['max_row']
         st.metric(label="Highest Overall Score Achieved", value=f"{max_score_row['Name']} ({max_score_row['Year']})", delta=f"{max_score_row['Overall Score']:.2f}")
     with c2:
-        country_avg_score = DF.groupby('Country')['Overall Score'].mean().sort_values(ascending=False).reset_index()
+        country_avg_score = cube.country_mean(['Overall Score'])['Overall Score'].sort_values(ascending=False).reset_index()
         st.metric(label="Top Country by Mean Score", value=country_avg_score.iloc[0]['Country'], delta=f"{country_avg_score.iloc[0]['Overall Score']:.2f}")
-        min_score_row = DF.loc[DF['Overall Score'].idxmin()]
+        min_score_row = eda['min_row']
         st.metric(label="Lowest Overall Score Achieved", value=f"{min_score_row['Name']} ({min_score_row['Year']})", delta=f"{min_score_row['Overall Score']:.2f}")
 
     st.markdown("---")
     st.subheader("Data Distributions")
     
     col1, col2 = st.columns(2)
-    with col1:
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(DF['Overall Score'].dropna(), kde=True, ax=ax, bins=30)
-        ax.set_title("Overall Score Distribution")
-        st.pyplot(fig)
-
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(DF['Student Population'].dropna(), kde=True, ax=ax, bins=30)
-        ax.set_title("Student Population Distribution")
-        st.pyplot(fig)
-
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(DF['International Students'].dropna(), kde=True, ax=ax, bins=30)
-        ax.set_title("International Students % Distribution")
-        st.pyplot(fig)
-
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(DF['Students to Staff Ratio'].dropna(), kde=True, ax=ax, bins=30)
-        ax.set_title("Students to Staff Ratio Distribution")
-        st.pyplot(fig)
\ No newline at end of file
+    for col, (column, title) in zip([col1, col2, col1, col2], DISTRIBUTION_COLS.items()):
+        with col:
+            st.image(distribution_png(eda['distributions'][column], version, column, title), use_container_width=True)
@@ -1,79 +1,138 @@
 import streamlit as st
-import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
+from instrumentation import instrumented_cache
 
-def render_map_tab(DF):
+# ISO 3166-1 alpha-3 codes for the dataset's country names (locationmode='ISO-3').
+# Northern Cyprus has no code of its own and is left off the maps.
+COUNTRY_ISO3 = {
+    'Algeria': 'DZA', 'Argentina': 'ARG', 'Armenia': 'ARM', 'Australia': 'AUS', 'Austria': 'AUT',
+    'Azerbaijan': 'AZE', 'Bahrain': 'BHR', 'Bangladesh': 'BGD', 'Belarus': 'BLR', 'Belgium': 'BEL',
+    'Bolivia': 'BOL', 'Bosnia and Herzegovina': 'BIH', 'Botswana': 'BWA', 'Brazil': 'BRA',
+    'Brunei Darussalam': 'BRN', 'Bulgaria': 'BGR', 'Canada': 'CAN', 'Chile': 'CHL', 'China': 'CHN',
+    'Colombia': 'COL', 'Costa Rica': 'CRI', 'Croatia': 'HRV', 'Cuba': 'CUB', 'Cyprus': 'CYP',
+    'Czech Republic': 'CZE', 'Democratic Republic of the Congo': 'COD', 'Denmark': 'DNK',
+    'Ecuador': 'ECU', 'Egypt': 'EGY', 'Estonia': 'EST', 'Ethiopia': 'ETH', 'Fiji': 'FJI',
+    'Finland': 'FIN', 'France': 'FRA', 'Georgia': 'GEO', 'Germany': 'DEU', 'Ghana': 'GHA',
+    'Greece': 'GRC', 'Hong Kong': 'HKG', 'Hungary': 'HUN', 'Iceland': 'ISL', 'India': 'IND',
+    'Indonesia': 'IDN', 'Iran': 'IRN', 'Iraq': 'IRQ', 'Ireland': 'IRL', 'Israel': 'ISR',
+    'Italy': 'ITA', 'Jamaica': 'JAM', 'Japan': 'JPN', 'Jordan': 'JOR', 'Kazakhstan': 'KAZ',
+    'Kenya': 'KEN', 'Kosovo': 'XKX', 'Kuwait': 'KWT', 'Latvia': 'LVA', 'Lebanon': 'LBN',
+    'Lithuania': 'LTU', 'Luxembourg': 'LUX', 'Macao': 'MAC', 'Malaysia': 'MYS', 'Malta': 'MLT',
+    'Mauritius': 'MUS', 'Mexico': 'MEX', 'Mongolia': 'MNG', 'Montenegro': 'MNE', 'Morocco': 'MAR',
+    'Mozambique': 'MOZ', 'Namibia': 'NAM', 'Nepal': 'NPL', 'Netherlands': 'NLD',
+    'New Zealand': 'NZL', 'Nigeria': 'NGA', 'North Macedonia': 'MKD', 'Norway': 'NOR',
+    'Oman': 'OMN', 'Pakistan': 'PAK', 'Palestine': 'PSE', 'Paraguay': 'PRY', 'Peru': 'PER',
+    'Philippines': 'PHL', 'Poland': 'POL', 'Portugal': 'PRT', 'Puerto Rico': 'PRI', 'Qatar': 'QAT',
+    'Romania': 'ROU', 'Russian Federation': 'RUS', 'Rwanda': 'RWA', 'Saudi Arabia': 'SAU',
+    'Serbia': 'SRB', 'Singapore': 'SGP', 'Slovakia': 'SVK', 'Slovenia': 'SVN',
+    'South Africa': 'ZAF', 'South Korea': 'KOR', 'Spain': 'ESP', 'Sri Lanka': 'LKA',
+    'Sweden': 'SWE', 'Switzerland': 'CHE', 'Syria': 'SYR', 'Taiwan': 'TWN', 'Tanzania': 'TZA',
+    'Thailand': 'THA', 'Tunisia': 'TUN', 'Turkey': 'TUR', 'Uganda': 'UGA', 'Ukraine': 'UKR',
+    'United Arab Emirates': 'ARE', 'United Kingdom': 'GBR', 'United States': 'USA',
+    'Uruguay': 'URY', 'Uzbekistan': 'UZB', 'Venezuela': 'VEN', 'Vietnam': 'VNM',
+    'Zambia': 'ZMB', 'Zimbabwe': 'ZWE',
+}
+
+MAPS = {
+    'Universities': 'Count of Universities Over Time',
+    'International Students': 'Avg % International Students Over Time',
+    'Female %': 'Avg % Female Students Over Time',
+}
+
+
+def animated_choropleth(long_df, value, title):
+    """
+    Animated choropleth by Year with one base trace over every country that ever
+    appears (ISO-3 locations, names for hover) and frames that carry only z.
+    Countries without data in a year are NaN, which Plotly leaves unfilled.
+
+    Each frame carries the year's full z array rather than the values that changed
+    since the previous year: Plotly replaces a trace's arrays wholesale when it
+    applies a frame, and the slider jumps between non-adjacent years, so a frame
+    must hold the complete state. As base64 float32 that is ~4 bytes per country
+    per year (about 6 KB for every frame of a map).
+
+    Args:
+        long_df (pd.DataFrame): Year, Country and `value` columns.
+        value (str): The column to color by.
+        title (str): The figure title.
+    """
+    long_df = long_df[long_df['Country'].isin(COUNTRY_ISO3.keys())]
+    grid = long_df.pivot(index='Year', columns='Country', values=value)
+    years, countries = grid.index.tolist(), grid.columns.tolist()
+    z = grid.to_numpy(dtype=np.float32)  # Half the bytes of float64 per frame
+    z_format = '' if value == 'Universities' else ':.2f'
+    hover = f'<b>%{{text}}</b><br>{value}=%{{z{z_format}}}<extra></extra>'
+
+    fig = go.Figure(
+        data=[go.Choropleth(
+            locations=[COUNTRY_ISO3[c] for c in countries], locationmode='ISO-3',
+            text=countries, z=z[0], coloraxis='coloraxis', hovertemplate=hover)],
+        frames=[go.Frame(data=[go.Choropleth(z=z[i])], name=str(year), traces=[0])
+                for i, year in enumerate(years)],
+    )
+
+    # Same controls as px.choropleth(animation_frame='Year')
+    frame_args = {'frame': {'duration': 500, 'redraw': True}, 'mode': 'immediate',
+                  'fromcurrent': True, 'transition': {'duration': 500, 'easing': 'linear'}}
+    fig.update_layout(
+        title=title,
+        geo=dict(projection_type='natural earth', showcoastlines=True),
+        coloraxis=dict(colorbar_title_text=value),
+        updatemenus=[dict(
+            type='buttons', direction='left', pad={'r': 10, 't': 70}, showactive=False,
+            x=0.1, xanchor='right', y=0, yanchor='top',
+            buttons=[dict(label='&#9654;', method='animate', args=[None, frame_args]),
+                     dict(label='&#9724;', method='animate',
+                          args=[[None], {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
+                                         'fromcurrent': True, 'transition': {'duration': 0}}])])],
+        sliders=[dict(
+            active=0, currentvalue={'prefix': 'Year='}, len=0.9, x=0.1, xanchor='left',
+            y=0, yanchor='top', pad={'b': 10, 't': 60},
+            steps=[dict(label=str(year), method='animate',
+                        args=[[str(year)], {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
+                                            'fromcurrent': True, 'transition': {'duration': 0, 'easing': 'linear'}}])
+                   for year in years])],
+        height=600, width=800,
+    )
+    return fig
+
+
+@instrumented_cache(st.cache_resource(show_spinner=False))
+def map_figure(_cube, value, version):
+    """
+    Animated map for one metric, built once per cube content and shared by every
+    session (st.plotly_chart only reads it), so reruns neither parse nor validate it.
+
+    Args:
+        _cube (StatsCube): Pre-aggregated Year x Country statistics (not hashed).
+        value (str): A key of MAPS.
+        version (str): The cube's fingerprint, which keys the cache instead of `_cube`.
+    """
+    if value == 'Universities':
+        long_df = _cube.year_country_rows()
+    else:
+        long_df = _cube.year_country_mean([value])
+    return animated_choropleth(long_df, value, MAPS[value])
+
+
+def render_map_tab(cube):
     """
     Renders the Animated World Map tab with various choropleth maps.
 
     Args:
-        DF (pd.DataFrame): The original, unfiltered DataFrame.
+        cube (StatsCube): Pre-aggregated Year x Country statistics of the unfiltered data.
     """
     st.subheader('Global Choropleth Maps')
+    version = cube.fingerprint
 
     # --- Animated map for University Count ---
-    uni_year = (
-        DF
-        .groupby(['Year','Country'])
-        .size()
-        .reset_index(name='Universities')
-    )
-    map_anim1 = px.choropleth(
-        uni_year,
-        locations='Country',
-        locationmode='country names',
-        color='Universities',
-        projection='natural earth',
-        animation_frame='Year',
-        title='Count of Universities Over Time'
-    )
-    map_anim1.update_layout(
-        geo=dict(showcoastlines=True),
-        height=600, width=800
-    )
-    st.plotly_chart(map_anim1, use_container_width=True)
-    st.markdown("---")
-
-    # --- Animated map for International Students ---
-    intl_year = (
-        DF
-        .groupby(['Year','Country'])['International Students']
-        .mean()
-        .reset_index()
-    )
-    map_anim2 = px.choropleth(
-        intl_year,
-        locations='Country',
-        locationmode='country names',
-        color='International Students',
-        projection='natural earth',
-        animation_frame='Year',
-        title='Avg % International Students Over Time'
-    )
-    map_anim2.update_layout(
-        geo=dict(showcoastlines=True),
-        height=600, width=800
-    )
-    st.plotly_chart(map_anim2, use_container_width=True)
-    st.markdown("---")
-    
-    # --- Animated map for Female Student Percentage ---
-    female_year = (
-        DF
-        .groupby(['Year','Country'])['Female %']
-        .mean()
-        .reset_index()
-    )
-    map_anim3 = px.choropleth(
-        female_year,
-        locations='Country',
-        locationmode='country names',
-        color='Female %',
-        projection='natural earth',
-        animation_frame='Year',
-        title='Avg % Female Students Over Time'
-    )
-    map_anim3.update_layout(
-        geo=dict(showcoastlines=True),
-        height=600, width=800
-    )
-    st.plotly_chart(map_anim3, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(map_figure(cube, 'Universities', version), use_container_width=True)
+
+    # --- Animated maps for International Students and Female Student Percentage ---
+    # Loaded only on request; each map is a separate animated figure to transfer
+    for value, key in [('International Students', 'map_show_intl'), ('Female %', 'map_show_female')]:
+        st.markdown("---")
+        if st.toggle(f'Show map: {MAPS[value]}', key=key):
+            st.plotly_chart(map_figure(cube, value, version), use_container_width=True)
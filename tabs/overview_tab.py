@@ -1,5 +1,6 @@
 import streamlit as st
 import plotly.express as px
+from name_index import get_name_index
 
 def render_overview_tab(df, DF):
     """
@@ -27,7 +28,7 @@ def render_overview_tab(df, DF):
     
     st.subheader('Rank Trajectories (2016-2025)')
     # Use the original unfiltered DF for trajectories but default selection to filtered top 20
-    all_unis = sorted(DF['Name'].unique())
+    all_unis = get_name_index().names
     sel_uni = st.multiselect('Select universities for trajectory', all_unis, default=top20['Name'].tolist())
     if sel_uni:
         tra = DF[DF.Name.isin(sel_uni)].sort_values(['Name', 'Year'])
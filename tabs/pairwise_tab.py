@@ -1,7 +1,57 @@
+import os
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 
+# Above this many rows the pair plot is drawn as binned densities instead of points
+PAIRWISE_POINT_LIMIT = int(os.environ.get('WUR_PAIRWISE_POINT_LIMIT', 3000))
+DENSITY_BINS = 30
+
+
+def density_scatter_matrix(df, dimensions, title, bins=DENSITY_BINS):
+    """
+    Scatter-matrix layout drawn from server-side 2D histograms: a count heatmap per
+    off-diagonal panel and a histogram on the diagonal. The payload is
+    len(dimensions)^2 * bins^2 cells whatever the number of rows.
+    """
+    n = len(dimensions)
+    values = {d: df[d].to_numpy(dtype=float, na_value=np.nan) for d in dimensions}
+    edges = {}
+    for d in dimensions:
+        finite = values[d][np.isfinite(values[d])]
+        lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        edges[d] = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+
+    fig = make_subplots(rows=n, cols=n, shared_xaxes='columns', horizontal_spacing=0.02, vertical_spacing=0.02)
+    for i, y_dim in enumerate(dimensions):
+        for j, x_dim in enumerate(dimensions):
+            x, y = values[x_dim], values[y_dim]
+            centers_x = (edges[x_dim][:-1] + edges[x_dim][1:]) / 2
+            if i == j:
+                counts, _ = np.histogram(x[np.isfinite(x)], bins=edges[x_dim])
+                fig.add_trace(go.Bar(x=centers_x, y=counts.astype(np.uint32), marker_color='#636efa',
+                                     name=x_dim, hovertemplate='%{x:.1f}: %{y}<extra></extra>'),
+                              row=i + 1, col=j + 1)
+            else:
+                ok = np.isfinite(x) & np.isfinite(y)
+                counts, _, _ = np.histogram2d(y[ok], x[ok], bins=[edges[y_dim], edges[x_dim]])
+                centers_y = (edges[y_dim][:-1] + edges[y_dim][1:]) / 2
+                fig.add_trace(go.Heatmap(x=centers_x, y=centers_y,
+                                         z=np.where(counts > 0, counts, np.nan).astype(np.float32),
+                                         colorscale='Blues', showscale=False,
+                                         hovertemplate=f'{x_dim}: %{{x:.1f}}<br>{y_dim}: %{{y:.1f}}<br>Universities: %{{z}}<extra></extra>'),
+                              row=i + 1, col=j + 1)
+            if i == n - 1:
+                fig.update_xaxes(title_text=x_dim, row=i + 1, col=j + 1)
+            if j == 0:
+                fig.update_yaxes(title_text=y_dim, row=i + 1, col=j + 1)
+    fig.update_layout(title=title, showlegend=False, bargap=0)
+    return fig
+
+
 def render_pairwise_tab(df, selected_vars):
     """
     Renders the Pairwise analysis tab with scatter matrix and heatmaps.
@@ -12,15 +62,25 @@ def render_pairwise_tab(df, selected_vars):
     """
     st.subheader('Pair Plot of Core Metrics')
     st.markdown("This plot shows the relationship between each pair of the core metrics. The diagonal shows the distribution of each metric.")
-    
-    fig11 = px.scatter_matrix(
-        df, 
-        dimensions=selected_vars, 
-        title='Pair Plot of Metrics (respects filters)', 
-        height=800, 
-        hover_name='Name'
+
+    render_mode = st.radio(
+        'Rendering', ['Auto', 'Points', 'Density'], horizontal=True, key='pairwise_render_mode',
+        help=f"Auto draws every university up to {PAIRWISE_POINT_LIMIT:,} rows and binned densities above that."
     )
-    fig11.update_traces(marker=dict(size=3, opacity=0.7))
+    use_density = render_mode == 'Density' or (render_mode == 'Auto' and len(df) > PAIRWISE_POINT_LIMIT)
+
+    if use_density:
+        fig11 = density_scatter_matrix(df, selected_vars, f'Pair Plot of Metrics (respects filters, density of {len(df):,} universities)')
+        fig11.update_layout(height=800)
+    else:
+        fig11 = px.scatter_matrix(
+            df, 
+            dimensions=selected_vars, 
+            title='Pair Plot of Metrics (respects filters)', 
+            height=800, 
+            hover_name='Name'
+        )
+        fig11.update_traces(marker=dict(size=3, opacity=0.7))
     fig11.update_layout(
         font=dict(size=9), 
         margin=dict(l=40, r=40, t=100, b=40)
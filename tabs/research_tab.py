@@ -1,40 +1,124 @@
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
+from trendlines import TRENDLINE_METHODS, add_trendline
 
-def render_research_tab(df, DF, selected_vars):
+# Selections up to this many rows keep every point on the violin plot
+VIOLIN_POINT_LIMIT = 500
+KDE_GRID = 128
+KDE_BINS = 512
+
+
+def distribution_summary(values, names, grid_size=KDE_GRID, bins=KDE_BINS):
+    """
+    KDE curve on a fixed grid plus box statistics and outliers of one metric.
+
+    The values are binned once and the Gaussian kernel (Silverman bandwidth, as in
+    Plotly's violins) is evaluated on the bin centres, so the cost past the binning
+    step and the size of the result do not depend on the number of rows.
+
+    Args:
+        values (np.ndarray): Metric values; NaNs are ignored.
+        names (np.ndarray): University names aligned with `values`, for outlier hovers.
+
+    Returns:
+        dict: grid, density, q1, median, q3, mean, lowerfence, upperfence and the
+        outlier values/names, or None if there are no values.
+    """
+    ok = np.isfinite(values)
+    values, names = values[ok], names[ok]
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lowerfence, upperfence = inside.min(), inside.max()
+    outliers = (values < lowerfence) | (values > upperfence)
+
+    spread = min(values.std(ddof=1) if values.size > 1 else 0, iqr / 1.349) or values.std() or 1.0
+    bandwidth = 1.059 * spread * values.size ** -0.2
+    lo, hi = values.min() - 2 * bandwidth, values.max() + 2 * bandwidth
+    counts, edges = np.histogram(values, bins=bins, range=(lo, hi))
+    centres = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(lo, hi, grid_size)
+    kernel = np.exp(-0.5 * ((grid[:, None] - centres[None, :]) / bandwidth) ** 2)
+    density = kernel @ counts / (values.size * bandwidth * np.sqrt(2 * np.pi))
+
+    return {
+        'grid': grid, 'density': density, 'q1': q1, 'median': median, 'q3': q3,
+        'mean': values.mean(), 'lowerfence': lowerfence, 'upperfence': upperfence,
+        'outlier_values': values[outliers], 'outlier_names': names[outliers],
+    }
+
+
+def summary_violin(df, metrics):
+    """Violin plot drawn from `distribution_summary` curves, boxes and outliers."""
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    names = df['Name'].astype(str).to_numpy()
+    for i, metric in enumerate(metrics):
+        s = distribution_summary(df[metric].to_numpy(dtype=float, na_value=np.nan), names)
+        if s is None:
+            continue
+        color = colors[i % len(colors)]
+        half_width = 0.4 * s['density'] / s['density'].max()
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([i - half_width, (i + half_width)[::-1]]),
+            y=np.concatenate([s['grid'], s['grid'][::-1]]),
+            fill='toself', mode='lines', line=dict(color=color, width=1),
+            name=metric, hoverinfo='skip'))
+        fig.add_trace(go.Box(
+            x=[i], q1=[s['q1']], median=[s['median']], q3=[s['q3']], mean=[s['mean']],
+            lowerfence=[s['lowerfence']], upperfence=[s['upperfence']],
+            width=0.08, marker_color=color, line=dict(color=color), name=metric, showlegend=False))
+        if s['outlier_values'].size:
+            fig.add_trace(go.Scatter(
+                x=np.full(s['outlier_values'].size, i), y=s['outlier_values'],
+                mode='markers', marker=dict(color=color, size=4),
+                hovertext=s['outlier_names'], hoverinfo='text+y', name=metric, showlegend=False))
+    fig.update_layout(xaxis=dict(tickvals=list(range(len(metrics))), ticktext=metrics, title='Metric'),
+                      yaxis_title='Value', legend_title_text='Metric')
+    return fig
+
+
+def render_research_tab(df, cube, selected_vars):
     """
     Renders the Research & Industry tab with analysis on research and industry metrics.
 
     Args:
         df (pd.DataFrame): The filtered DataFrame based on sidebar selections.
-        DF (pd.DataFrame): The original, unfiltered DataFrame.
+        cube (StatsCube): Pre-aggregated Year x Country statistics of the unfiltered data.
         selected_vars (list): List of core metric column names.
     """
-    # This chart uses the original unfiltered DF to show the global trend
+    # This chart uses the unfiltered statistics to show the global trend
     st.subheader('Average Metrics Over Time Worldwide (2016-2025)')
-    time_df = DF.groupby('Year')[selected_vars].mean().reset_index()
+    time_df = cube.year_mean(selected_vars).reset_index()
     fig17 = px.area(time_df, x='Year', y=selected_vars)
     st.plotly_chart(fig17, use_container_width=True)
     st.markdown("---")
 
     st.subheader('Analysis Based on Sidebar Filters')
+    trend = st.radio('Trendline', TRENDLINE_METHODS, horizontal=True, key='research_trendline')
 
     col1, col2 = st.columns(2)
     with col1:
         st.write('Research Quality vs Overall Score')
-        fig6 = px.scatter(df, x='Research Quality', y='Overall Score', trendline='ols', hover_name='Name')
+        fig6 = px.scatter(df, x='Research Quality', y='Overall Score', hover_name='Name')
+        add_trendline(fig6, df, 'Research Quality', 'Overall Score', trend)
         st.plotly_chart(fig6, use_container_width=True)
         
     with col2:
         st.write('Industry Impact vs Research Environment')
-        fig7 = px.scatter(df, x='Industry Impact', y='Research Environment', size='Overall Score', hover_name='Name', trendline='ols')
+        fig7 = px.scatter(df, x='Industry Impact', y='Research Environment', size='Overall Score', hover_name='Name')
+        add_trendline(fig7, df, 'Industry Impact', 'Research Environment', trend)
         st.plotly_chart(fig7, use_container_width=True)
 
     st.markdown('---')
 
     # This bar chart now respects the sidebar filters by using 'df'
     st.subheader('Top 10 Countries by Average Research Quality')
-    rq = df.groupby('Country')['Research Quality'].mean().nlargest(10).reset_index()
+    rq = df.groupby('Country', observed=True)['Research Quality'].mean().nlargest(10).reset_index()
     fig_rq = px.bar(rq, x='Research Quality', y='Country', orientation='h', title='Avg Research Quality by Country (for selection)')
     fig_rq.update_yaxes(autorange='reversed')
     st.plotly_chart(fig_rq, use_container_width=True)
@@ -47,6 +131,10 @@ def render_research_tab(df, DF, selected_vars):
         default=['Overall Score', 'Teaching', 'Research Environment', 'Research Quality', 'Industry Impact']
     )
     if selm:
-        melt2 = df[['Name'] + selm].melt(id_vars='Name', var_name='Metric', value_name='Value')
-        fig10 = px.violin(melt2, x='Metric', y='Value', box=True, points='all', hover_name='Name')
+        if len(df) <= VIOLIN_POINT_LIMIT:
+            melt2 = df[['Name'] + selm].melt(id_vars='Name', var_name='Metric', value_name='Value')
+            fig10 = px.violin(melt2, x='Metric', y='Value', box=True, points='all', hover_name='Name')
+        else:
+            # Large selections: precomputed densities and quantiles, points only for outliers
+            fig10 = summary_violin(df, selm)
         st.plotly_chart(fig10, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,149 @@
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import plotly.graph_objects as go
+
+TRENDLINE_METHODS = ['OLS', 'LOWESS', 'Robust (Huber)']
+
+
+class PairStats:
+    """
+    Sufficient statistics (n, Σx, Σy, Σxy, Σx², Σy²) of the complete (x, y) pairs of
+    two columns. They merge by addition and give the OLS line and R² in closed form.
+    """
+
+    def __init__(self, n=0, sx=0.0, sy=0.0, sxy=0.0, sxx=0.0, syy=0.0):
+        self.n, self.sx, self.sy, self.sxy, self.sxx, self.syy = n, sx, sy, sxy, sxx, syy
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        ok = np.isfinite(x) & np.isfinite(y)
+        x, y = x[ok], y[ok]
+        return cls(int(ok.sum()), x.sum(), y.sum(), x @ y, x @ x, y @ y)
+
+    def __add__(self, other):
+        return PairStats(self.n + other.n, self.sx + other.sx, self.sy + other.sy,
+                         self.sxy + other.sxy, self.sxx + other.sxx, self.syy + other.syy)
+
+    def ols(self):
+        """Returns (slope, intercept, R²), or None with fewer than two distinct x values."""
+        if self.n < 2:
+            return None
+        cxx = self.sxx - self.sx ** 2 / self.n
+        cxy = self.sxy - self.sx * self.sy / self.n
+        cyy = self.syy - self.sy ** 2 / self.n
+        if cxx <= 0:
+            return None
+        slope = cxy / cxx
+        intercept = (self.sy - slope * self.sx) / self.n
+        r2 = cxy ** 2 / (cxx * cyy) if cyy > 0 else 1.0
+        return slope, intercept, r2
+
+
+# --- Per-selection cache ---
+# FilterEngine.view returns the same frame object for a repeated filter combination,
+# so statistics are keyed by frame identity (checked through a weak reference).
+_CACHE_SIZE = 64
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached(df, key, compute):
+    full_key = (id(df),) + key
+    with _lock:
+        entry = _cache.get(full_key)
+        if entry is not None and entry[0]() is df:
+            _cache.move_to_end(full_key)
+            return entry[1]
+    value = compute()
+    with _lock:
+        _cache[full_key] = (weakref.ref(df), value)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def _xy(df, x, y):
+    return df[x].to_numpy(dtype=float, na_value=np.nan), df[y].to_numpy(dtype=float, na_value=np.nan)
+
+
+def pair_stats(df, x, y):
+    """Sufficient statistics of columns x and y of `df`, cached per frame."""
+    return _cached(df, ('stats', x, y), lambda: PairStats.from_arrays(*_xy(df, x, y)))
+
+
+def ols_fit(df, x, y):
+    """(slope, intercept, R²) of the OLS fit of y on x, or None if undefined."""
+    return pair_stats(df, x, y).ols()
+
+
+def lowess_fit(df, x, y, frac=0.6667):
+    """Sorted (x, fitted y) arrays of a LOWESS smooth; imports statsmodels on first use."""
+    def compute():
+        from statsmodels.nonparametric.smoothers_lowess import lowess
+        xs, ys = _xy(df, x, y)
+        ok = np.isfinite(xs) & np.isfinite(ys)
+        fitted = lowess(ys[ok], xs[ok], frac=frac)
+        return fitted[:, 0], fitted[:, 1]
+    return _cached(df, ('lowess', x, y, frac), compute)
+
+
+def robust_fit(df, x, y):
+    """(slope, intercept) of a Huber robust linear fit; imports statsmodels on first use."""
+    def compute():
+        import statsmodels.api as sm
+        xs, ys = _xy(df, x, y)
+        ok = np.isfinite(xs) & np.isfinite(ys)
+        if ok.sum() < 2 or np.ptp(xs[ok]) == 0:
+            return None
+        params = sm.RLM(ys[ok], sm.add_constant(xs[ok]), M=sm.robust.norms.HuberT()).fit().params
+        return params[1], params[0]
+    return _cached(df, ('robust', x, y), compute)
+
+
+def add_trendline(fig, df, x, y, method='OLS'):
+    """
+    Adds a trendline for y on x to a scatter figure.
+
+    Args:
+        fig (go.Figure): The scatter figure.
+        df (pd.DataFrame): The plotted data.
+        x (str): The x column.
+        y (str): The y column.
+        method (str): One of TRENDLINE_METHODS. OLS is closed-form from cached sums;
+            LOWESS and robust fits are computed with statsmodels on demand.
+
+    Returns:
+        go.Figure: The same figure.
+    """
+    xs, ys = _xy(df, x, y)
+    fitted = xs[np.isfinite(xs) & np.isfinite(ys)]  # The rows every fit uses
+    if fitted.size == 0:
+        return fig
+    x_line = np.array([fitted.min(), fitted.max()])
+
+    if method == 'LOWESS':
+        x_line, y_line = lowess_fit(df, x, y)
+        hover = f'<b>LOWESS trendline</b><br>{x}=%{{x}}<br>{y}=%{{y}} <b>(trend)</b><extra></extra>'
+    elif method == 'Robust (Huber)':
+        fit = robust_fit(df, x, y)
+        if fit is None:
+            return fig
+        slope, intercept = fit
+        y_line = slope * x_line + intercept
+        hover = (f'<b>Robust trendline</b><br>{y} = {slope:g} * {x} + {intercept:g}<br>'
+                 f'{x}=%{{x}}<br>{y}=%{{y}} <b>(trend)</b><extra></extra>')
+    else:
+        fit = ols_fit(df, x, y)
+        if fit is None:
+            return fig
+        slope, intercept, r2 = fit
+        y_line = slope * x_line + intercept
+        hover = (f'<b>OLS trendline</b><br>{y} = {slope:g} * {x} + {intercept:g}<br>'
+                 f'R<sup>2</sup>={r2:.6f}<br><br>{x}=%{{x}}<br>{y}=%{{y}} <b>(trend)</b><extra></extra>')
+
+    fig.add_trace(go.Scatter(x=x_line, y=y_line, mode='lines', showlegend=False,
+                             line=dict(color=fig.data[0].marker.color if fig.data else None),
+                             hovertemplate=hover))
+    return fig
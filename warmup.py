@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+from pathlib import Path
+import streamlit as st
+import numpy as np
+from data_processing import CACHE_DIR
+from instrumentation import instrumented_cache
+
+# Compile the UMAP/HDBSCAN kernels and load the peer graph in a background thread when the server starts ('0' disables it)
+WARMUP_ENABLED = os.environ.get('WUR_WARMUP', '1') == '1'
+
+# numba's on-disk cache of compiled kernels (pynndescent compiles its kernels with cache=True).
+# Keep it on a persistent volume so new processes and pods load them instead of recompiling.
+NUMBA_CACHE_DIR = Path(os.environ.get('NUMBA_CACHE_DIR', CACHE_DIR / 'numba'))
+
+# Synthetic sample sizes: below and above the 4096 rows at which UMAP switches from
+# exact nearest neighbours to NN-descent, so both code paths get compiled
+WARMUP_ROWS = (300, 4200)
+
+
+def configure_numba_cache():
+    """Points numba's kernel cache at NUMBA_CACHE_DIR; only effective before numba is imported."""
+    os.environ.setdefault('NUMBA_CACHE_DIR', str(NUMBA_CACHE_DIR))
+
+
+configure_numba_cache()
+
+
+class Warmup:
+    """
+    Background compilation of the numba kernels behind umap-learn, pynndescent and
+    hdbscan, by fitting the dashboard's UMAP and HDBSCAN parameters on small
+    synthetic datasets. It first starts the default metrics' k-NN peer graph (see
+    knn_graph.start_knn_graph), so a cold store is built before anyone asks. The
+    state is 'idle' until started, then 'running', 'done' or 'failed'.
+    """
+
+    def __init__(self):
+        self.state = 'idle'
+        self.started = None
+        self.elapsed = None
+        self.error = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.state = 'running'
+            self.started = time.time()
+            self._thread = threading.Thread(target=self._run, name='umap-warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            # Load the peer graph of the default metrics, or start building it (in its own thread)
+            from knn_graph import start_knn_graph
+            from sections import SELECTED_VARS
+            start_knn_graph(SELECTED_VARS)
+
+            import umap
+            import hdbscan
+            from tabs.advanced_insights_tab import UMAP_PARAMS, HDBSCAN_PARAMS
+
+            rng = np.random.default_rng(0)
+            for rows in WARMUP_ROWS:
+                X = rng.normal(size=(rows, 5))
+                embedding = umap.UMAP(**UMAP_PARAMS).fit_transform(X)
+                hdbscan.HDBSCAN(**HDBSCAN_PARAMS).fit_predict(embedding)
+            self.state = 'done'
+        except Exception as exc:  # The warm-up is an optimization; the tab still fits on demand
+            self.error = f'{type(exc).__name__}: {exc}'
+            self.state = 'failed'
+        finally:
+            self.elapsed = time.time() - self.started
+
+    def wait(self, timeout=None):
+        """Blocks until the warm-up finished (or `timeout` seconds passed); returns True if done."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == 'done'
+
+
+# Process-wide warm-up status, read by the Advanced Insights tab
+WARMUP = Warmup()
+
+
+@instrumented_cache(st.cache_resource)
+def start_warmup():
+    """Starts the background warm-up once per process (unless WUR_WARMUP=0)."""
+    return WARMUP.start() if WARMUP_ENABLED else WARMUP